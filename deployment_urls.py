@@ -0,0 +1,108 @@
+"""Cached lookup of Deployment URLs by name.
+
+Flows find the services they talk to (the MLflow tracking server, the
+Datadog agent) by asking the deployment API, `AppDeployer().list_deployments`,
+which is a control-plane round trip. get_deployment_url() caches the answer
+in the process and on disk for DEPLOYMENT_URL_TTL seconds (default 600), so
+only the first lookup in that window reaches the API. Call it where the URL
+is used, not at import time, and no other task pays for it.
+
+    from deployment_urls import get_deployment_url
+
+    url = get_deployment_url("mlflow-tracking")
+
+Entries are scoped to the Metaflow profile, since the same name can be a
+different deployment under another one. If a deployment was recreated at a
+new URL, pass refresh=True or call forget_deployment_url().
+
+The tutorials that use this module link to it, so Metaflow packages it with
+their flows.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+CACHE_DIR = os.environ.get(
+    "DEPLOYMENT_URL_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "deployment-urls"),
+)
+TTL_SECONDS = float(os.environ.get("DEPLOYMENT_URL_TTL", 600))
+
+# cache key -> (resolved at, URL)
+_cache: Dict[str, Tuple[float, str]] = {}
+_lock = threading.Lock()
+
+
+def cache_key(name: str) -> str:
+    scope = "\n".join(
+        [os.environ.get("METAFLOW_HOME", ""), os.environ.get("METAFLOW_PROFILE", ""), name]
+    )
+    return hashlib.sha256(scope.encode("utf8")).hexdigest()[:32]
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def _read_disk(key: str) -> Optional[Tuple[float, str]]:
+    try:
+        with open(_cache_path(key), "r") as f:
+            entry = json.load(f)
+        return entry["resolved_at"], entry["url"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_disk(key: str, name: str, resolved_at: float, url: str) -> None:
+    path = _cache_path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp_path, "w") as f:
+            json.dump({"name": name, "url": url, "resolved_at": resolved_at}, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        # A read-only home directory only costs other processes a lookup
+        pass
+
+
+def lookup_deployment_url(name: str) -> str:
+    """Ask the deployment API for the internal URL of Deployment `name`."""
+    from metaflow.apps import AppDeployer
+
+    deployments = AppDeployer().list_deployments(name=name)
+    if not deployments:
+        raise ValueError(f"No deployment found with name '{name}'")
+    return deployments[0].internal_url
+
+
+def get_deployment_url(name: str, ttl: float = TTL_SECONDS, refresh: bool = False) -> str:
+    """Internal URL of Deployment `name`, from the cache if resolved less than `ttl` s ago."""
+    key = cache_key(name)
+    # Held during the lookup, so concurrent callers share one request
+    with _lock:
+        now = time.time()
+        if not refresh:
+            for entry in (_cache.get(key), _read_disk(key)):
+                if entry is not None and now - entry[0] < ttl:
+                    _cache[key] = entry
+                    return entry[1]
+        url = lookup_deployment_url(name)
+        _cache[key] = (now, url)
+        _write_disk(key, name, now, url)
+    return url
+
+
+def forget_deployment_url(name: str) -> None:
+    """Drop the cached URL of Deployment `name`."""
+    key = cache_key(name)
+    with _lock:
+        _cache.pop(key, None)
+        try:
+            os.remove(_cache_path(key))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""Post-deploy smoke tests for a fleet of Deployments.
+
+Every check of every Deployment is sent concurrently over a single pooled
+`requests.Session`, and the auth headers are resolved once and reused, so
+verifying a whole fleet takes about as long as its slowest endpoint.
+
+Supported kinds and what is checked:
+
+    evidently  GET /api/version, GET / (UI)
+    mlflow     GET /health, GET /api/2.0/mlflow/experiments/search
+    vllm       GET /health, GET /v1/models (at least one model served)
+    fastapi    GET /, GET /openapi.json
+
+Targets come from `--target KIND=URL` (repeatable) and/or a YAML or JSON
+file with a list of `{name, kind, url}` entries:
+
+    python smoke_test.py --target evidently=https://evidently-ui-xyz.outerbounds.xyz \\
+        --target vllm=https://api-c-oik87o.dev-yellow.outerbounds.xyz --junit smoke.xml
+
+    python smoke_test.py --targets deployments.yaml --json smoke.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Statuses worth retrying while a Deployment is still rolling out
+RETRY_STATUSES = (502, 503, 504)
+
+
+class Check(NamedTuple):
+    name: str
+    path: str
+    # Returns an error message, or None if the response is as expected
+    validate: Callable[[requests.Response], Optional[str]]
+    allow_redirects: bool = True
+
+
+class Target(NamedTuple):
+    name: str
+    kind: str
+    url: str
+
+
+def expect_ok(response: requests.Response) -> Optional[str]:
+    if response.status_code != 200:
+        return f"Unexpected status: {response.status_code}"
+    return None
+
+
+def expect_reachable(response: requests.Response) -> Optional[str]:
+    """Browser-auth UIs may redirect to a login page; that still counts as up."""
+    if response.status_code not in (200, 302, 307, 308):
+        return f"Unexpected status: {response.status_code}"
+    return None
+
+
+def expect_json(*keys: str) -> Callable[[requests.Response], Optional[str]]:
+    """200 with a JSON object holding all of `keys`."""
+
+    def validate(response: requests.Response) -> Optional[str]:
+        error = expect_ok(response)
+        if error:
+            return error
+        try:
+            body = response.json()
+        except ValueError:
+            return f"Response is not JSON: {response.text[:200]}"
+        missing = [key for key in keys if key not in body]
+        if missing:
+            return f"Missing {', '.join(missing)} in response: {response.text[:200]}"
+        return None
+
+    return validate
+
+
+def expect_models(response: requests.Response) -> Optional[str]:
+    error = expect_json("data")(response)
+    if error:
+        return error
+    if not response.json()["data"]:
+        return "No models served"
+    return None
+
+
+CHECKS: Dict[str, List[Check]] = {
+    "evidently": [
+        Check("health", "/api/version", expect_json("version")),
+        Check("ui", "/", expect_reachable, allow_redirects=False),
+    ],
+    "mlflow": [
+        Check("health", "/health", expect_ok),
+        Check("tracking-api", "/api/2.0/mlflow/experiments/search?max_results=1", expect_ok),
+    ],
+    "vllm": [
+        Check("health", "/health", expect_ok),
+        Check("models", "/v1/models", expect_models),
+    ],
+    "fastapi": [
+        Check("root", "/", expect_ok),
+        Check("openapi", "/openapi.json", expect_json("paths")),
+    ],
+}
+
+
+@lru_cache(maxsize=None)
+def get_auth_headers() -> Dict[str, str]:
+    """Metaflow auth headers, resolved once per process."""
+    try:
+        from metaflow.metaflow_config_funcs import init_config
+
+        conf = init_config()
+        if conf:
+            return {"x-api-key": conf["METAFLOW_SERVICE_AUTH_KEY"]}
+    except Exception as e:
+        print(f"Warning: Could not read Metaflow config: {e}")
+    if os.environ.get("METAFLOW_SERVICE_AUTH_KEY"):
+        return {"x-api-key": os.environ["METAFLOW_SERVICE_AUTH_KEY"]}
+    if os.environ.get("METAFLOW_SERVICE_HEADERS"):
+        headers = json.loads(os.environ["METAFLOW_SERVICE_HEADERS"])
+        return {"x-api-key": headers.get("x-api-key", "")}
+    print("Warning: No Metaflow credentials found, sending requests without auth")
+    return {}
+
+
+def make_session(n_hosts: int, concurrency: int, retries: int) -> requests.Session:
+    """One session for all checks: a connection pool per host, sized for the workers."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=["GET"],
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=max(n_hosts, 1), pool_maxsize=concurrency, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def parse_target(spec: str) -> Target:
+    """`KIND=URL`, optionally `NAME:KIND=URL`."""
+    kind, sep, url = spec.partition("=")
+    if not sep or not url:
+        raise argparse.ArgumentTypeError(f"Expected KIND=URL, got {spec!r}")
+    name, _, kind = kind.rpartition(":")
+    return make_target(kind, url, name or None)
+
+
+def make_target(kind: str, url: str, name: Optional[str] = None) -> Target:
+    if kind not in CHECKS:
+        raise argparse.ArgumentTypeError(f"Unknown kind {kind!r}, expected one of {', '.join(CHECKS)}")
+    return Target(name or f"{kind}-{urlparse(url).netloc}", kind, url.rstrip("/"))
+
+
+def load_targets(path: str) -> List[Target]:
+    import yaml  # JSON is valid YAML
+
+    with open(path) as f:
+        entries = yaml.safe_load(f) or []
+    return [make_target(entry["kind"], entry["url"], entry.get("name")) for entry in entries]
+
+
+def run_check(session: requests.Session, target: Target, check: Check, headers: Dict[str, str], timeout: float) -> Dict:
+    start = time.perf_counter()
+    try:
+        response = session.get(
+            target.url + check.path, headers=headers, timeout=timeout, allow_redirects=check.allow_redirects
+        )
+        error = check.validate(response)
+        status = response.status_code
+    except requests.exceptions.Timeout:
+        error, status = "Request timed out", None
+    except requests.exceptions.ConnectionError as e:
+        error, status = f"Connection error: {e}", None
+    except Exception as e:
+        error, status = f"Error: {e}", None
+    return {
+        "target": target.name,
+        "kind": target.kind,
+        "url": target.url + check.path,
+        "check": check.name,
+        "passed": error is None,
+        "status": status,
+        "seconds": time.perf_counter() - start,
+        "error": error,
+    }
+
+
+def run_smoke_tests(
+    targets: List[Target], headers: Dict[str, str], concurrency: int = 16, timeout: float = 10, retries: int = 2
+) -> List[Dict]:
+    """Run every check of every target concurrently; results keep the target order."""
+    jobs = [(target, check) for target in targets for check in CHECKS[target.kind]]
+    session = make_session(len({urlparse(t.url).netloc for t in targets}), concurrency, retries)
+    with session, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(lambda job: run_check(session, *job, headers, timeout), jobs))
+
+
+def write_junit(path: str, results: List[Dict], elapsed: float) -> None:
+    """One <testsuite> per target, one <testcase> per check."""
+    root = ET.Element("testsuites", tests=str(len(results)), time=f"{elapsed:.3f}")
+    root.set("failures", str(sum(not r["passed"] for r in results)))
+    suites: Dict[str, ET.Element] = {}
+    for r in results:
+        suite = suites.get(r["target"])
+        if suite is None:
+            suite = suites[r["target"]] = ET.SubElement(root, "testsuite", name=r["target"], tests="0", failures="0")
+        suite.set("tests", str(int(suite.get("tests")) + 1))
+        case = ET.SubElement(suite, "testcase", classname=f"{r['kind']}.{r['target']}", name=r["check"], time=f"{r['seconds']:.3f}")
+        if not r["passed"]:
+            suite.set("failures", str(int(suite.get("failures")) + 1))
+            ET.SubElement(case, "failure", message=r["error"]).text = f"GET {r['url']}\n{r['error']}"
+    ET.ElementTree(root).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Smoke-test deployed apps concurrently",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("\n\n", 1)[1],
+    )
+    parser.add_argument("--target", type=parse_target, action="append", default=[], help="KIND=URL or NAME:KIND=URL")
+    parser.add_argument("--targets", help="YAML/JSON file with a list of {name, kind, url}")
+    parser.add_argument("--no-auth", action="store_true", help="Do not send Metaflow auth headers")
+    parser.add_argument("--concurrency", type=int, default=16, help="Checks in flight at once")
+    parser.add_argument("--timeout", type=float, default=10, help="Per-request timeout in seconds")
+    parser.add_argument("--retries", type=int, default=2, help="Retries on connection errors and 502/503/504")
+    parser.add_argument("--junit", help="Write JUnit XML results to this file")
+    parser.add_argument("--json", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    targets = list(args.target)
+    if args.targets:
+        targets += load_targets(args.targets)
+    if not targets:
+        parser.error("No targets given; use --target or --targets")
+
+    headers = {} if args.no_auth else get_auth_headers()
+    start = time.perf_counter()
+    results = run_smoke_tests(targets, headers, args.concurrency, args.timeout, args.retries)
+    elapsed = time.perf_counter() - start
+
+    for r in results:
+        status = "PASS" if r["passed"] else "FAIL"
+        print(f"{status} - {r['target']} {r['check']} ({r['seconds'] * 1000:.0f} ms)")
+        if r["error"]:
+            print(f"     {r['error']}")
+    failed = sum(not r["passed"] for r in results)
+    print(f"{len(results) - failed}/{len(results)} checks passed across {len(targets)} deployments in {elapsed:.2f}s")
+
+    if args.junit:
+        write_junit(args.junit, results, elapsed)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"seconds": elapsed, "results": results}, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+Single-pass aggregation of the e-commerce sales table.
+
+Instead of one pandas groupby per summary, every key column is factorized
+once and all sums, counts and distinct counts are computed with
+`np.bincount` over the integer codes. The result is a set of partial
+aggregates that add up across shards, as long as each shard holds a
+disjoint set of customers (see `hash_partition` in flow.py): distinct
+customers per day, region or product then simply sum across shards.
+
+Regional and product partials also carry a HyperLogLog sketch of their
+customers (see sketches.py). Exact distinct counts stop adding up once
+partials from different runs are merged, since the same customers come
+back day after day; the sketches still merge and give the estimate.
+
+In sketch mode (a `SketchSettings` is passed), no exact distinct counts are
+computed at all: daily, regional and product partials only carry sketches,
+and customer segments come from a KLL sketch of customer spend instead of
+a `pd.qcut` over every customer.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from sketches import (
+    HLL_PRECISION,
+    KLL_K,
+    SketchSettings,
+    from_column,
+    hash_values,
+    hll_estimate,
+    hll_registers,
+    kll_merge,
+    kll_quantiles,
+    kll_sketch,
+    to_column,
+)
+
+# Largest groups x members grid for which distinct counts use a dense
+# bincount; larger grids fall back to sorting the (group, member) pairs.
+DENSE_DISTINCT_MAX_CELLS = 1 << 26
+
+PARTIAL_KEYS = {
+    "daily": "date",
+    "regional": "region",
+    "customers": "customer_id",
+    "products": "product_id",
+}
+
+# Partials whose distinct customers overlap across runs get a sketch column.
+SKETCHED_PARTIALS = ("regional", "products")
+
+SEGMENTS = ["Bronze", "Silver", "Gold", "Platinum"]
+
+
+def factorize(values: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    """Integer codes and sorted unique keys of a column."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Categorical codes are already dense and ordered by category
+        keys = pd.CategoricalIndex(values.cat.categories, dtype=values.dtype)
+        return values.cat.codes.to_numpy(), keys
+    codes, uniques = pd.factorize(values, sort=True)
+    return codes, pd.Index(uniques)
+
+
+def distinct_counts(
+    group_codes: np.ndarray, n_groups: int, member_codes: np.ndarray, n_members: int
+) -> np.ndarray:
+    """Number of distinct members in each group."""
+    pairs = group_codes.astype(np.int64) * n_members + member_codes
+    if n_groups * n_members <= DENSE_DISTINCT_MAX_CELLS:
+        present = np.bincount(pairs, minlength=n_groups * n_members) > 0
+        return present.reshape(n_groups, n_members).sum(axis=1)
+    return np.bincount(np.unique(pairs) // n_members, minlength=n_groups)
+
+
+def aggregate_sales(
+    sales_df: pd.DataFrame, sketch: Optional[SketchSettings] = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    Compute the daily, regional, customer and product partial aggregates of
+    a sales table in one pass over its columns. Key columns must not
+    contain nulls. With `sketch`, distinct customers are only sketched and a
+    "spend" partial holds a KLL sketch of the total spent per customer.
+    """
+    revenue = sales_df["total_price"].to_numpy(dtype=np.float64)
+    quantity = sales_df["quantity"].to_numpy(dtype=np.float64)
+    factorized = {key: factorize(sales_df[key]) for key in PARTIAL_KEYS.values()}
+    customer_codes, customers = factorized["customer_id"]
+    customer_hashes = hash_values(customers.to_numpy())[customer_codes]
+    precision = sketch.hll_precision if sketch else HLL_PRECISION
+
+    partials = {}
+    for name, key in PARTIAL_KEYS.items():
+        codes, keys = factorized[key]
+        n = len(keys)
+        partial = {
+            key: keys,
+            "revenue": np.bincount(codes, weights=revenue, minlength=n),
+            "orders": np.bincount(codes, minlength=n),
+            "quantity": np.bincount(codes, weights=quantity, minlength=n).astype(
+                np.int64
+            ),
+        }
+        if key != "customer_id" and sketch is None:
+            partial["customers"] = distinct_counts(
+                codes, n, customer_codes, len(customers)
+            )
+        if name in SKETCHED_PARTIALS or (sketch and key != "customer_id"):
+            partial["customer_sketch"] = to_column(
+                hll_registers(codes, n, customer_hashes, precision)
+            )
+        partial = pd.DataFrame(partial)
+        # Unobserved categories get empty groups; drop them like groupby does
+        partials[name] = partial[partial["orders"] > 0].reset_index(drop=True)
+
+    if sketch:
+        partials["spend"] = kll_sketch(partials["customers"]["revenue"], sketch.kll_k)
+    return partials
+
+
+def merge_partials(
+    partials: List[Dict[str, pd.DataFrame]],
+    disjoint_customers: bool = True,
+    sketch: Optional[SketchSettings] = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Add up partial aggregates. With `disjoint_customers` (partials of
+    customer-shards of one sales table), exact distinct counts are summed
+    and spend sketches merged. Otherwise (e.g. partials of different runs)
+    distinct counts are estimated from the merged customer sketches, and
+    spend sketches are dropped since per-customer totals change.
+    """
+    merged = {}
+    for name, key in PARTIAL_KEYS.items():
+        combined = pd.concat([partial[name] for partial in partials], ignore_index=True)
+        sketched = "customer_sketch" in combined.columns
+        grouped = combined.drop(columns="customer_sketch", errors="ignore").groupby(
+            key, observed=True, sort=True
+        )
+        table = grouped.sum().reset_index()
+        if sketched:
+            # Sketches merge with an element-wise max of their registers
+            registers = from_column(combined["customer_sketch"])
+            union = np.zeros((len(table), registers.shape[1]), dtype=np.uint8)
+            np.maximum.at(union, grouped.ngroup().to_numpy(), registers)
+            if not disjoint_customers or "customers" not in table.columns:
+                table["customers"] = hll_estimate(union)
+            table["customer_sketch"] = to_column(union)
+        merged[name] = table
+
+    if disjoint_customers and all("spend" in partial for partial in partials):
+        k = sketch.kll_k if sketch else KLL_K
+        merged["spend"] = kll_merge([partial["spend"] for partial in partials], k)
+    return merged
+
+
+def spend_segments(
+    total_spent: pd.Series,
+    spend: Optional[pd.DataFrame] = None,
+    sketch: Optional[SketchSettings] = None,
+) -> pd.Series:
+    """
+    Quartile segments of customer spend. In sketch mode the quartiles come
+    from the merged spend sketch, or a sketch of `total_spent` if there is
+    none (e.g. after merging runs).
+    """
+    if sketch is None:
+        return pd.qcut(total_spent, q=4, labels=SEGMENTS)
+    if spend is None:
+        spend = kll_sketch(total_spent, sketch.kll_k)
+    quartiles = kll_quantiles(spend, [0.25, 0.5, 0.75])
+    return pd.cut(total_spent, bins=[-np.inf, *quartiles, np.inf], labels=SEGMENTS)
+
+
+def finalize_aggregates(
+    merged: Dict[str, pd.DataFrame], sketch: Optional[SketchSettings] = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    Turn merged partial aggregates into the tables ECommerceAnalysisFlow
+    publishes: daily_sales, regional_sales, customer_stats, product_stats
+    and summary_stats.
+    """
+    daily, regional = merged["daily"], merged["regional"]
+    customers, products = merged["customers"], merged["products"]
+
+    daily_sales = pd.DataFrame(
+        {
+            "date": daily["date"],
+            "daily_revenue": daily["revenue"],
+            "items_sold": daily["quantity"],
+            "unique_customers": daily["customers"],
+        }
+    )
+    regional_sales = pd.DataFrame(
+        {
+            "region": regional["region"],
+            "total_price": regional["revenue"],
+            "quantity": regional["quantity"],
+            "customer_id": regional["customers"],
+        }
+    )
+
+    customer_stats = pd.DataFrame(
+        {
+            "customer_id": customers["customer_id"],
+            "total_spent": customers["revenue"],
+            "avg_order_value": customers["revenue"] / customers["orders"],
+            "number_of_orders": customers["orders"],
+            "total_items_bought": customers["quantity"],
+        }
+    )
+    customer_stats["segment"] = spend_segments(
+        customer_stats["total_spent"], merged.get("spend"), sketch
+    )
+
+    product_stats = pd.DataFrame(
+        {
+            "product_id": products["product_id"],
+            "total_revenue": products["revenue"],
+            "avg_price": products["revenue"] / products["orders"],
+            "units_sold": products["quantity"],
+            "unique_customers": products["customers"],
+        }
+    )
+    product_stats["revenue_rank"] = product_stats["total_revenue"].rank(ascending=False)
+
+    total_revenue = customers["revenue"].sum()
+    total_orders = customers["orders"].sum()
+    summary_stats = pd.DataFrame(
+        {
+            "metric": [
+                "Total Revenue",
+                "Total Orders",
+                "Total Customers",
+                "Avg Order Value",
+                "Items per Order",
+            ],
+            "value": [
+                total_revenue,
+                total_orders,
+                len(customers),
+                total_revenue / total_orders,
+                customers["quantity"].sum() / total_orders,
+            ],
+        }
+    )
+
+    return {
+        "daily_sales": daily_sales,
+        "regional_sales": regional_sales,
+        "customer_stats": customer_stats,
+        "product_stats": product_stats,
+        "summary_stats": summary_stats,
+    }
@@ -0,0 +1,196 @@
+"""
+Benchmark the single-pass aggregation in aggregation.py against the
+per-step pandas groupbys ECommerceAnalysisFlow used to run, and check that
+both produce the same tables. The sketch mode is timed as well, and its
+distinct counts and segments are compared with the exact ones. Usage:
+
+    python benchmark_aggregation.py --n-records 10000000 --n-customers 1000000
+"""
+
+import argparse
+import time
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from aggregation import aggregate_sales, finalize_aggregates, merge_partials
+from flow import generate_sales, hash_partition
+from sketches import SketchSettings, kll_quantiles
+
+
+def pandas_aggregates(sales_df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """The original daily/customer/product/summary steps, one groupby each."""
+    daily_sales = (
+        sales_df.groupby("date")
+        .agg({"total_price": "sum", "quantity": "sum", "customer_id": "nunique"})
+        .reset_index()
+    )
+    daily_sales.columns = ["date", "daily_revenue", "items_sold", "unique_customers"]
+
+    regional_sales = (
+        sales_df.groupby("region", observed=True)
+        .agg({"total_price": "sum", "quantity": "sum", "customer_id": "nunique"})
+        .reset_index()
+    )
+
+    customer_stats = (
+        sales_df.groupby("customer_id")
+        .agg({"total_price": ["sum", "mean", "count"], "quantity": "sum"})
+        .reset_index()
+    )
+    customer_stats.columns = [
+        "customer_id",
+        "total_spent",
+        "avg_order_value",
+        "number_of_orders",
+        "total_items_bought",
+    ]
+    customer_stats["segment"] = pd.qcut(
+        customer_stats["total_spent"],
+        q=4,
+        labels=["Bronze", "Silver", "Gold", "Platinum"],
+    )
+
+    product_stats = (
+        sales_df.groupby("product_id")
+        .agg(
+            {
+                "total_price": ["sum", "mean"],
+                "quantity": "sum",
+                "customer_id": "nunique",
+            }
+        )
+        .reset_index()
+    )
+    product_stats.columns = [
+        "product_id",
+        "total_revenue",
+        "avg_price",
+        "units_sold",
+        "unique_customers",
+    ]
+    product_stats["revenue_rank"] = product_stats["total_revenue"].rank(ascending=False)
+
+    total_revenue = sales_df["total_price"].sum()
+    total_orders = len(sales_df)
+    summary_stats = pd.DataFrame(
+        {
+            "metric": [
+                "Total Revenue",
+                "Total Orders",
+                "Total Customers",
+                "Avg Order Value",
+                "Items per Order",
+            ],
+            "value": [
+                total_revenue,
+                total_orders,
+                sales_df["customer_id"].nunique(),
+                total_revenue / total_orders,
+                sales_df["quantity"].sum() / total_orders,
+            ],
+        }
+    )
+
+    return {
+        "daily_sales": daily_sales,
+        "regional_sales": regional_sales,
+        "customer_stats": customer_stats,
+        "product_stats": product_stats,
+        "summary_stats": summary_stats,
+    }
+
+
+def fused_aggregates(
+    sales_df: pd.DataFrame,
+    n_shards: int = 1,
+    sketch: Optional[SketchSettings] = None,
+    merged: Optional[dict] = None,
+):
+    """Aggregate each customer shard in one pass, then merge the partials."""
+    shards = (
+        hash_partition(sales_df, "customer_id", n_shards)
+        if n_shards > 1
+        else [sales_df]
+    )
+    partials = merge_partials(
+        [aggregate_sales(s, sketch) for s in shards], sketch=sketch
+    )
+    if merged is not None:
+        merged.update(partials)
+    return finalize_aggregates(partials, sketch)
+
+
+def relative_errors(estimate: pd.Series, exact: pd.Series) -> str:
+    errors = (estimate.to_numpy() / exact.to_numpy() - 1) * 100
+    return f"mean {np.abs(errors).mean():.2f}%, max {np.abs(errors).max():.2f}%"
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n-records", type=int, default=10_000_000)
+    parser.add_argument("--n-customers", type=int, default=200)
+    parser.add_argument("--n-shards", type=int, default=4)
+    parser.add_argument("--distinct-error", type=float, default=0.02)
+    parser.add_argument("--quantile-error", type=float, default=0.01)
+    args = parser.parse_args()
+
+    sales_df = generate_sales(args.n_records, n_customers=args.n_customers)
+    sales_df = sales_df.sort_values("date")
+    print(f"Sales table: {len(sales_df):,} rows")
+
+    expected, pandas_time = timed(pandas_aggregates, sales_df)
+    fused, fused_time = timed(fused_aggregates, sales_df)
+    sharded, _ = timed(fused_aggregates, sales_df, args.n_shards)
+
+    for name, table in expected.items():
+        for result in (fused, sharded):
+            pd.testing.assert_frame_equal(
+                result[name].reset_index(drop=True),
+                table.reset_index(drop=True),
+                check_dtype=False,
+                check_categorical=False,
+            )
+    print(f"Outputs match ({args.n_shards} shards merged included)")
+
+    print(f"pandas groupbys: {pandas_time:.2f}s")
+    print(f"single pass:     {fused_time:.2f}s ({pandas_time / fused_time:.1f}x)")
+
+    settings = SketchSettings.from_errors(args.distinct_error, args.quantile_error)
+    merged = {}
+    sketched, sketch_time = timed(fused_aggregates, sales_df, 1, settings, merged)
+    print(f"sketch mode:     {sketch_time:.2f}s ({pandas_time / sketch_time:.1f}x)")
+    sharded = {}
+    fused_aggregates(sales_df, args.n_shards, settings, sharded)
+
+    print(f"\nSketch accuracy ({settings}):")
+    for name, column in [
+        ("daily_sales", "unique_customers"),
+        ("regional_sales", "customer_id"),
+        ("product_stats", "unique_customers"),
+    ]:
+        error = relative_errors(sketched[name][column], expected[name][column])
+        print(f"  {name}.{column}: {error}")
+
+    spent = np.sort(expected["customer_stats"]["total_spent"].to_numpy())
+    for label, spend in [("1 shard", merged["spend"]), ("merged", sharded["spend"])]:
+        quartiles = kll_quantiles(spend, [0.25, 0.5, 0.75])
+        ranks = np.searchsorted(spent, quartiles, side="right") / len(spent)
+        rank_error = np.abs(ranks - [0.25, 0.5, 0.75]).max()
+        print(f"  spend quartile rank error ({label}): {rank_error:.4f}")
+    agreement = (
+        sketched["customer_stats"]["segment"].astype(str)
+        == expected["customer_stats"]["segment"].astype(str)
+    ).mean()
+    print(f"  customers in the exact segment: {agreement:.2%}")
+
+
+if __name__ == "__main__":
+    main()
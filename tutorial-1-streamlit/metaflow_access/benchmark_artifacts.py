@@ -0,0 +1,69 @@
+"""
+Compare pickled DataFrame artifacts with the Parquet tables from columnar.py.
+
+Metaflow stores every artifact as a gzip-compressed pickle, the Parquet bytes
+included, so both columns measure what Metaflow actually stores and loads:
+gzip(pickle(DataFrame)) against gzip(pickle(Parquet bytes)). Every Parquet
+load includes unpickling the whole blob; only the decoding after it is
+restricted to a column or row group. Usage:
+
+    python benchmark_artifacts.py --n-records 10000000
+"""
+
+import argparse
+import gzip
+import pickle
+import time
+
+from columnar import read_table, write_table
+from flow import generate_sales
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def pickle_artifact(df) -> bytes:
+    # Same encoding as Metaflow's content-addressed store
+    return gzip.compress(pickle.dumps(df, protocol=4), compresslevel=3)
+
+
+def unpickle_artifact(blob: bytes):
+    return pickle.loads(gzip.decompress(blob))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n-records", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    df = generate_sales(args.n_records).sort_values("date")
+    print(f"Sales table: {len(df):,} rows")
+
+    pickled, pickle_write = timed(pickle_artifact, df)
+    stored, parquet_write = timed(lambda: pickle_artifact(write_table(df)))
+    _, pickle_load = timed(unpickle_artifact, pickled)
+    _, parquet_load = timed(lambda: read_table(unpickle_artifact(stored)))
+    _, column_load = timed(
+        lambda: read_table(unpickle_artifact(stored), columns=["total_price"])
+    )
+    _, row_group_load = timed(
+        lambda: read_table(unpickle_artifact(stored), row_groups=[0])
+    )
+
+    rows = [
+        ("Size (MB)", len(pickled) / 1024**2, len(stored) / 1024**2),
+        ("Write (s)", pickle_write, parquet_write),
+        ("Full load (s)", pickle_load, parquet_load),
+        ("One column (s)", pickle_load, column_load),
+        ("One row group (s)", pickle_load, row_group_load),
+    ]
+    print(f"{'':<20}{'pickle+gzip':>14}{'parquet':>14}")
+    for label, pickle_value, parquet_value in rows:
+        print(f"{label:<20}{pickle_value:>14.3f}{parquet_value:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
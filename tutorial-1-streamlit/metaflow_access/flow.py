@@ -1,12 +1,112 @@
 """
 Sample Metaflow that generates various DataFrames for visualization testing.
 This flow simulates an e-commerce data analysis pipeline.
+
+Tables are stored as compact Parquet bytes (see columnar.py) rather than
+pickled DataFrames; use `columnar.read_table` to load them.
+
+With --incremental, the flow only generates and aggregates the days after
+the latest successful run, and merges them into that run's aggregate state.
+With --sketch, distinct customers and spend segments are estimated with
+mergeable sketches (see sketches.py) within --distinct-error and
+--quantile-error.
 """
 
-from metaflow import FlowSpec, step, current
+from metaflow import Flow, FlowSpec, Parameter, Run, step, current
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
+import math
+from typing import List, Optional
+
+from aggregation import aggregate_sales, finalize_aggregates, merge_partials
+from columnar import read_table, table_info, write_table
+from sketches import SketchSettings
+
+REGIONS = ["North", "South", "East", "West"]
+N_DAYS = 30
+
+# Rows generated at a time; bounds the temporary arrays for very large runs.
+GENERATION_CHUNK_ROWS = 10_000_000
+
+# Target rows per foreach shard in the sales aggregation.
+ROWS_PER_SHARD = 5_000_000
+
+
+def today() -> np.datetime64:
+    return np.datetime64(datetime.now(), "D")
+
+
+def generate_sales(
+    n_records: int,
+    seed: int = 42,
+    chunk_rows: int = GENERATION_CHUNK_ROWS,
+    first_day: Optional[np.datetime64] = None,
+    n_days: int = N_DAYS,
+    n_customers: int = 200,
+) -> pd.DataFrame:
+    """
+    Generate `n_records` sample sales by `n_customers` customers over
+    `n_days` days starting at `first_day` (by default, the last N_DAYS days
+    up to today).
+    Columns are preallocated and filled chunk by chunk from a single
+    np.random.Generator, so the output only depends on the seed and days.
+    """
+    rng = np.random.default_rng(seed)
+    if first_day is None:
+        first_day = today() - (n_days - 1)
+    first_day = np.datetime64(first_day, "D").astype("datetime64[ns]")
+
+    date = np.empty(n_records, dtype="datetime64[ns]")
+    product_id = np.empty(n_records, dtype=np.int64)
+    customer_id = np.empty(n_records, dtype=np.int64)
+    quantity = np.empty(n_records, dtype=np.int64)
+    unit_price = np.empty(n_records, dtype=np.float64)
+    region_codes = np.empty(n_records, dtype=np.int8)
+
+    for start in range(0, n_records, chunk_rows):
+        stop = min(start + chunk_rows, n_records)
+        size = stop - start
+        day = rng.integers(0, n_days, size)
+        date[start:stop] = first_day + day * np.timedelta64(1, "D")
+        product_id[start:stop] = rng.integers(1, 51, size)
+        customer_id[start:stop] = rng.integers(1, n_customers + 1, size)
+        quantity[start:stop] = rng.integers(1, 11, size)
+        unit_price[start:stop] = rng.uniform(10, 1000, size).round(2)
+        region_codes[start:stop] = rng.integers(0, len(REGIONS), size)
+
+    return pd.DataFrame(
+        {
+            "date": date,
+            "product_id": product_id,
+            "customer_id": customer_id,
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "region": pd.Categorical.from_codes(region_codes, categories=REGIONS),
+            "total_price": quantity * unit_price,
+        }
+    )
+
+
+def hash_partition(df: pd.DataFrame, key: str, n_shards: int) -> List[pd.DataFrame]:
+    """
+    Split `df` into `n_shards` frames by hashing `key`, so every row with a
+    given key value lands in the same shard and per-key aggregates computed
+    on a shard are complete.
+    """
+    shard_of_row = pd.util.hash_array(df[key].to_numpy()) % np.uint64(n_shards)
+    order = np.argsort(shard_of_row, kind="stable")
+    bounds = np.cumsum(np.bincount(shard_of_row.astype(np.int64), minlength=n_shards))
+    grouped = df.take(order)
+    return [grouped.iloc[start:stop] for start, stop in zip([0, *bounds[:-1]], bounds)]
+
+
+def find_previous_run(flow_name: str) -> Optional[Run]:
+    """Latest successful run of the flow that stored an aggregate state."""
+    for run in Flow(flow_name).runs():
+        if run.successful and "aggregate_state" in run.end_task:
+            return run
+    return None
 
 
 class ECommerceAnalysisFlow(FlowSpec):
@@ -15,161 +115,171 @@ class ECommerceAnalysisFlow(FlowSpec):
     creating different types of DataFrames at various steps.
     """
 
-    @step
-    def start(self):
-        """Generate sample sales data."""
-        # Create sample sales data
-        np.random.seed(42)
-        n_records = 1000
-
-        # Generate dates for the last 30 days
-        dates = [datetime.now() - timedelta(days=x) for x in range(30)]
-
-        self.sales_df = pd.DataFrame(
-            {
-                "date": np.random.choice(dates, n_records),
-                "product_id": np.random.randint(1, 51, n_records),
-                "customer_id": np.random.randint(1, 201, n_records),
-                "quantity": np.random.randint(1, 11, n_records),
-                "unit_price": np.random.uniform(10, 1000, n_records).round(2),
-                "region": np.random.choice(
-                    ["North", "South", "East", "West"], n_records
-                ),
-            }
-        )
+    n_records = Parameter(
+        "n-records",
+        help="Number of sample sales records to generate",
+        default=1000,
+        type=int,
+    )
 
-        # Calculate total price
-        self.sales_df["total_price"] = (
-            self.sales_df["quantity"] * self.sales_df["unit_price"]
-        )
+    max_shards = Parameter(
+        "max-shards",
+        help="Upper bound on parallel shards for the sales aggregation",
+        default=8,
+        type=int,
+    )
 
-        # Sort by date
-        self.sales_df = self.sales_df.sort_values("date")
+    incremental = Parameter(
+        "incremental",
+        help="Only process the days after the latest successful run and merge "
+        "them into its aggregates",
+        is_flag=True,
+        default=False,
+    )
 
-        self.next(self.daily_analysis)
+    sketch = Parameter(
+        "sketch",
+        help="Estimate distinct customers and spend segments with sketches",
+        is_flag=True,
+        default=False,
+    )
 
-    @step
-    def daily_analysis(self):
-        """Perform daily sales analysis."""
-        # Daily sales summary
-        self.daily_sales = (
-            self.sales_df.groupby("date")
-            .agg({"total_price": "sum", "quantity": "sum", "customer_id": "nunique"})
-            .reset_index()
-        )
-
-        self.daily_sales.columns = [
-            "date",
-            "daily_revenue",
-            "items_sold",
-            "unique_customers",
-        ]
-
-        # Regional analysis
-        self.regional_sales = (
-            self.sales_df.groupby("region")
-            .agg({"total_price": "sum", "quantity": "sum", "customer_id": "nunique"})
-            .reset_index()
-        )
+    distinct_error = Parameter(
+        "distinct-error",
+        help="Relative standard error of distinct counts in sketch mode",
+        default=0.02,
+        type=float,
+    )
 
-        self.next(self.customer_analysis)
+    quantile_error = Parameter(
+        "quantile-error",
+        help="Rank error of the spend quantiles behind segments in sketch mode",
+        default=0.01,
+        type=float,
+    )
 
     @step
-    def customer_analysis(self):
-        """Analyze customer behavior."""
-        # Customer purchase history
-        self.customer_stats = (
-            self.sales_df.groupby("customer_id")
-            .agg({"total_price": ["sum", "mean", "count"], "quantity": "sum"})
-            .reset_index()
+    def start(self):
+        """
+        Generate sample sales data: the last N_DAYS days, or in incremental
+        mode the days since the previous run.
+        """
+        first_day, n_days = today() - (N_DAYS - 1), N_DAYS
+        self.sketch_settings = (
+            SketchSettings.from_errors(self.distinct_error, self.quantile_error)
+            if self.sketch
+            else None
         )
+        self.previous_run = None
+        self.previous_state = None
+        if self.incremental:
+            previous = find_previous_run(current.flow_name)
+            previous_settings = (
+                getattr(previous.data, "sketch_settings", None) if previous else None
+            )
+            if previous is not None and previous_settings != self.sketch_settings:
+                print(
+                    f"{previous.pathspec} used other sketch settings, processing all days"
+                )
+            elif previous is not None:
+                self.previous_run = previous.pathspec
+                self.previous_state = previous.data.aggregate_state
+                days = read_table(self.previous_state["daily"], columns=["date"])
+                first_day = np.datetime64(days["date"].max(), "D") + 1
+                n_days = int((today() - first_day).astype(int)) + 1
+                print(f"Merging {max(n_days, 0)} new day(s) into {previous.pathspec}")
+            else:
+                print("No previous run with an aggregate state, processing all days")
 
-        self.customer_stats.columns = [
-            "customer_id",
-            "total_spent",
-            "avg_order_value",
-            "number_of_orders",
-            "total_items_bought",
-        ]
-
-        # Add customer segments
-        self.customer_stats["segment"] = pd.qcut(
-            self.customer_stats["total_spent"],
-            q=4,
-            labels=["Bronze", "Silver", "Gold", "Platinum"],
-        )
+        n_records = self.n_records if n_days > 0 else 0
+        sales_df = generate_sales(n_records, first_day=first_day, n_days=max(n_days, 1))
+
+        # Sort by date
+        self.sales_df = write_table(sales_df.sort_values("date"))
 
-        self.next(self.product_analysis)
+        self.next(self.partition_customers)
 
     @step
-    def product_analysis(self):
-        """Analyze product performance."""
-        # Product performance metrics
-        self.product_stats = (
-            self.sales_df.groupby("product_id")
-            .agg(
-                {
-                    "total_price": ["sum", "mean"],
-                    "quantity": "sum",
-                    "customer_id": "nunique",
-                }
-            )
-            .reset_index()
+    def partition_customers(self):
+        """
+        Shard sales by customer. Each shard holds a disjoint set of customers,
+        so every aggregate, distinct customer counts included, adds up
+        across shards.
+        """
+        sales_df = read_table(
+            self.sales_df,
+            columns=[
+                "date",
+                "region",
+                "customer_id",
+                "product_id",
+                "quantity",
+                "total_price",
+            ],
         )
-
-        self.product_stats.columns = [
-            "product_id",
-            "total_revenue",
-            "avg_price",
-            "units_sold",
-            "unique_customers",
-        ]
-
-        # Calculate product ranking
-        self.product_stats["revenue_rank"] = self.product_stats["total_revenue"].rank(
-            ascending=False
+        n_shards = max(
+            1, min(self.max_shards, math.ceil(len(sales_df) / ROWS_PER_SHARD))
         )
+        # One artifact per shard so each foreach task only loads its own
+        shards = hash_partition(sales_df, "customer_id", n_shards)
+        for shard_id, shard in enumerate(shards):
+            setattr(self, f"customer_shard_{shard_id}", write_table(shard))
+        self.shard_ids = list(range(n_shards))
+        self.next(self.aggregate_shard, foreach="shard_ids")
 
+    @step
+    def aggregate_shard(self):
+        """Compute daily, regional, customer and product aggregates in one pass."""
+        shard = read_table(getattr(self, f"customer_shard_{self.input}"))
+        self.partials = {
+            name: write_table(partial)
+            for name, partial in aggregate_sales(shard, self.sketch_settings).items()
+        }
         self.next(self.create_summary)
 
     @step
-    def create_summary(self):
-        """Create summary dashboard data."""
-        # Overall summary metrics
-        total_revenue = self.sales_df["total_price"].sum()
-        total_orders = len(self.sales_df)
-        total_customers = self.sales_df["customer_id"].nunique()
-
-        self.summary_stats = pd.DataFrame(
-            {
-                "metric": [
-                    "Total Revenue",
-                    "Total Orders",
-                    "Total Customers",
-                    "Avg Order Value",
-                    "Items per Order",
-                ],
-                "value": [
-                    total_revenue,
-                    total_orders,
-                    total_customers,
-                    total_revenue / total_orders,
-                    self.sales_df["quantity"].sum() / total_orders,
-                ],
-            }
+    def create_summary(self, inputs):
+        """
+        Merge the shard aggregates, and in incremental mode the previous
+        run's aggregate state, into the summary tables. Segments and ranks
+        are rebuilt from the merged state.
+        """
+        sketch = inputs[0].sketch_settings
+        merged = merge_partials(
+            [
+                {name: read_table(blob) for name, blob in inp.partials.items()}
+                for inp in inputs
+            ],
+            sketch=sketch,
         )
+        previous_state = inputs[0].previous_state
+        if previous_state is not None:
+            previous = {name: read_table(blob) for name, blob in previous_state.items()}
+            merged = merge_partials(
+                [previous, merged], disjoint_customers=False, sketch=sketch
+            )
+
+        # Kept so the next incremental run can build on this one
+        self.aggregate_state = {
+            name: write_table(table) for name, table in merged.items()
+        }
+        for name, table in finalize_aggregates(merged, sketch).items():
+            setattr(self, name, write_table(table))
 
+        self.merge_artifacts(
+            inputs, include=["sales_df", "previous_run", "sketch_settings"]
+        )
         self.next(self.end)
 
     @step
     def end(self):
         """End of flow."""
         print("Flow completed successfully!")
-        print(f"Created {len(self.sales_df)} sample sales records")
-        print(
-            f"Generated {self.customer_stats['customer_id'].nunique()} customer profiles"
-        )
-        print(f"Analyzed {self.product_stats['product_id'].nunique()} products")
+        customer_ids = read_table(self.customer_stats, columns=["customer_id"])
+        product_ids = read_table(self.product_stats, columns=["product_id"])
+        print(f"Created {table_info(self.sales_df)['num_rows']} sample sales records")
+        print(f"Generated {customer_ids['customer_id'].nunique()} customer profiles")
+        print(f"Analyzed {product_ids['product_id'].nunique()} products")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,194 @@
+"""
+Column profiling for DataFrame artifacts.
+
+Statistics are computed one chunk of rows at a time with vectorized NumPy,
+so the temporary arrays stay bounded by the chunk size no matter how large
+the DataFrame is. Quantiles are read off a fine-grained histogram built in
+a second pass, which keeps them accurate to within one bin width
+((max - min) / QUANTILE_BINS) without sorting the whole column.
+"""
+
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import (
+    is_bool_dtype,
+    is_datetime64_any_dtype,
+    is_numeric_dtype,
+    is_timedelta64_dtype,
+)
+
+# Rows processed per chunk.
+PROFILE_CHUNK_ROWS = 1_000_000
+
+# Bins used to estimate quantiles, and the coarser bins shown as a histogram.
+# QUANTILE_BINS must be a multiple of HISTOGRAM_BINS.
+QUANTILE_BINS = 1000
+HISTOGRAM_BINS = 20
+
+# Most frequent values reported for non-numeric columns.
+TOP_K = 10
+
+QUANTILES = [0.25, 0.5, 0.75]
+
+
+def _is_temporal(series: pd.Series) -> bool:
+    return is_datetime64_any_dtype(series) or is_timedelta64_dtype(series)
+
+
+def _is_numeric(series: pd.Series) -> bool:
+    return _is_temporal(series) or (
+        is_numeric_dtype(series) and not is_bool_dtype(series)
+    )
+
+
+def _chunks(series: pd.Series, chunk_rows: int):
+    for start in range(0, len(series), chunk_rows):
+        yield series.iloc[start : start + chunk_rows]
+
+
+def _numeric_values(chunk: pd.Series) -> np.ndarray:
+    """Non-null values of a numeric, datetime or timedelta chunk as float64."""
+    chunk = chunk.dropna()
+    if _is_temporal(chunk):
+        # Ticks of the column's unit (s, ms, us or ns); converted back when
+        # reporting
+        return chunk.astype("int64").to_numpy(dtype="float64")
+    return chunk.to_numpy(dtype="float64")
+
+
+def _from_ticks(series: pd.Series, value: float):
+    """A value of _numeric_values() as a Timestamp or Timedelta of `series`."""
+    if is_timedelta64_dtype(series):
+        return pd.Timedelta(int(value), unit=series.dt.unit)
+    return pd.Timestamp(int(value), unit=series.dt.unit, tz=series.dt.tz)
+
+
+def _histogram_quantiles(
+    counts: np.ndarray, edges: np.ndarray, quantiles: List[float]
+) -> List[float]:
+    """Interpolate quantiles from histogram counts."""
+    cumulative = np.concatenate([[0], np.cumsum(counts)])
+    targets = np.asarray(quantiles) * cumulative[-1]
+    return list(np.interp(targets, cumulative, edges))
+
+
+def profile_numeric(
+    series: pd.Series, chunk_rows: int = PROFILE_CHUNK_ROWS
+) -> Dict[str, Any]:
+    """
+    Profile a numeric, datetime or timedelta column in two chunked passes.
+    Infinite values are counted in `non_finite` and left out of the
+    statistics and the histogram.
+    """
+    count, finite_count, total = 0, 0, 0.0
+    low, high = np.inf, -np.inf
+    for chunk in _chunks(series, chunk_rows):
+        values = _numeric_values(chunk)
+        count += len(values)
+        values = values[np.isfinite(values)]
+        if len(values):
+            finite_count += len(values)
+            total += values.sum()
+            low = min(low, values.min())
+            high = max(high, values.max())
+
+    profile = {
+        "count": count,
+        "nulls": len(series) - count,
+        "non_finite": count - finite_count,
+    }
+    if finite_count == 0:
+        return profile
+
+    # A constant column gets a unit-wide range so the bins are well defined
+    pad = 0.5 if low == high else 0.0
+    edges = np.linspace(low - pad, high + pad, QUANTILE_BINS + 1)
+    counts = np.zeros(QUANTILE_BINS, dtype=np.int64)
+    for chunk in _chunks(series, chunk_rows):
+        values = _numeric_values(chunk)
+        counts += np.histogram(values[np.isfinite(values)], bins=edges)[0]
+
+    quantiles = _histogram_quantiles(counts, edges, QUANTILES)
+    stats = {
+        "mean": total / finite_count,
+        "min": low,
+        **{f"p{int(q * 100)}": v for q, v in zip(QUANTILES, quantiles)},
+        "max": high,
+    }
+    histogram_edges = edges[:: QUANTILE_BINS // HISTOGRAM_BINS]
+    if _is_temporal(series):
+        stats = {k: _from_ticks(series, v) for k, v in stats.items()}
+        histogram_edges = [_from_ticks(series, v) for v in histogram_edges]
+
+    profile.update(stats)
+    profile["histogram"] = (
+        counts.reshape(HISTOGRAM_BINS, -1).sum(axis=1),
+        histogram_edges,
+    )
+    return profile
+
+
+def profile_categorical(
+    series: pd.Series, chunk_rows: int = PROFILE_CHUNK_ROWS, top_k: int = TOP_K
+) -> Dict[str, Any]:
+    """Profile a categorical, boolean or object column in one chunked pass."""
+    value_counts = pd.Series(dtype="int64")
+    for chunk in _chunks(series, chunk_rows):
+        value_counts = value_counts.add(chunk.value_counts(), fill_value=0)
+    # Unused categories of a `category` column are counted as zero
+    value_counts = value_counts[value_counts > 0]
+
+    count = int(value_counts.sum())
+    return {
+        "count": count,
+        "nulls": len(series) - count,
+        "distinct": len(value_counts),
+        "top_values": value_counts.nlargest(top_k).astype("int64"),
+    }
+
+
+def profile_dataframe(
+    df: pd.DataFrame, chunk_rows: int = PROFILE_CHUNK_ROWS
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Profile every column of a DataFrame.
+    Returns a dictionary of column name to its statistics; numeric columns
+    carry a `histogram` of (counts, edges), the others their `top_values`.
+    Statistics of datetime and timedelta columns are reported as timestamps
+    and timedeltas. A repeated column name gets its position appended.
+    """
+    profiles = {}
+    # By position: with duplicate names, df[name] is a DataFrame
+    for i, name in enumerate(df.columns):
+        series = df.iloc[:, i]
+        if _is_numeric(series):
+            profile = profile_numeric(series, chunk_rows)
+        else:
+            profile = profile_categorical(series, chunk_rows)
+        profile["dtype"] = str(series.dtype)
+        profile["null_pct"] = (
+            100 * profile["nulls"] / len(series) if len(series) else 0.0
+        )
+        key = str(name)
+        profiles[key if key not in profiles else f"{key} [{i}]"] = profile
+    return profiles
+
+
+def profile_summary(profiles: Dict[str, Dict[str, Any]]) -> pd.DataFrame:
+    """One row per column with the scalar statistics of a profile."""
+    rows = [
+        {
+            "column": name,
+            **{
+                k: v
+                for k, v in profile.items()
+                if k not in ("histogram", "top_values")
+            },
+        }
+        for name, profile in profiles.items()
+    ]
+    if not rows:
+        return pd.DataFrame(index=pd.Index([], name="column"))
+    return pd.DataFrame(rows).set_index("column")
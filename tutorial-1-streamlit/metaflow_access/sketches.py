@@ -0,0 +1,173 @@
+"""
+Mergeable sketches for the e-commerce aggregates.
+
+HyperLogLog registers estimate distinct counts per group. Registers for
+the same group merge with an element-wise maximum, so sketches built on
+different shards or different runs combine without revisiting the data.
+The relative standard error is about 1.04 / sqrt(2 ** precision).
+
+KLL sketches estimate quantiles. A sketch is a table of retained values,
+each standing for 2 ** level original values; merging concatenates the
+tables and compacts them back to size. The rank error shrinks as 1 / k.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# 2 ** 12 registers per group: ~1.6% standard error, 4 KiB per group.
+HLL_PRECISION = 12
+
+# KLL size parameter: a few hundred retained values, ~1% rank error.
+KLL_K = 200
+
+# Capacity ratio between consecutive KLL levels
+KLL_DECAY = 2 / 3
+
+# Rank error of a KLL sketch is about KLL_ERROR_SCALE / k (measured in
+# benchmark_aggregation.py; DataSketches quotes a similar constant).
+KLL_ERROR_SCALE = 1.7
+
+
+@dataclass(frozen=True)
+class SketchSettings:
+    """Sketch sizes used by the sketch mode of aggregation.py."""
+
+    hll_precision: int = HLL_PRECISION
+    kll_k: int = KLL_K
+
+    @classmethod
+    def from_errors(
+        cls, distinct_error: float, quantile_error: float
+    ) -> "SketchSettings":
+        """
+        Smallest sketches meeting a relative standard error for distinct
+        counts and a normalized rank error for quantiles.
+        """
+        precision = math.ceil(math.log2((1.04 / distinct_error) ** 2))
+        return cls(
+            hll_precision=min(max(precision, 4), 18),
+            kll_k=max(8, math.ceil(KLL_ERROR_SCALE / quantile_error)),
+        )
+
+
+def hash_values(values: np.ndarray) -> np.ndarray:
+    """64-bit hashes that are stable across processes and runs."""
+    return pd.util.hash_array(np.asarray(values))
+
+
+def hll_registers(
+    group_codes: np.ndarray,
+    n_groups: int,
+    hashes: np.ndarray,
+    precision: int = HLL_PRECISION,
+) -> np.ndarray:
+    """
+    Build one HyperLogLog sketch per group from the `hash_values` of its
+    members. Returns an (n_groups, 2 ** precision) uint8 array of registers.
+    """
+    n_registers = 1 << precision
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    # Position of the leading one bit among the remaining 64 - precision bits
+    rest = hashes & np.uint64((1 << (64 - precision)) - 1)
+    bit_length = np.frexp(rest.astype(np.float64))[1]
+    rank = (64 - precision - bit_length + 1).astype(np.uint8)
+
+    registers = np.zeros(n_groups * n_registers, dtype=np.uint8)
+    np.maximum.at(registers, group_codes.astype(np.int64) * n_registers + index, rank)
+    return registers.reshape(n_groups, n_registers)
+
+
+def hll_estimate(registers: np.ndarray) -> np.ndarray:
+    """Estimated distinct count of each sketch (row) in `registers`."""
+    n_registers = registers.shape[1]
+    alpha = 0.7213 / (1 + 1.079 / n_registers)
+    raw = (
+        alpha * n_registers**2 / np.sum(np.exp2(-registers.astype(np.float64)), axis=1)
+    )
+    # Linear counting is more accurate while many registers are still empty
+    zeros = (registers == 0).sum(axis=1)
+    with np.errstate(divide="ignore"):
+        linear = n_registers * np.log(n_registers / zeros)
+    use_linear = (raw <= 2.5 * n_registers) & (zeros > 0)
+    return np.round(np.where(use_linear, linear, raw)).astype(np.int64)
+
+
+def to_column(registers: np.ndarray) -> list:
+    """Store each sketch as bytes so it fits in a DataFrame/Parquet column."""
+    return [row.tobytes() for row in registers]
+
+
+def from_column(column: pd.Series) -> np.ndarray:
+    """Inverse of `to_column`."""
+    if len(column) == 0:
+        return np.zeros((0, 1 << HLL_PRECISION), dtype=np.uint8)
+    widths = {len(blob) for blob in column}
+    if len(widths) > 1:
+        raise ValueError("Cannot merge HyperLogLog sketches of different precisions")
+    return np.stack([np.frombuffer(blob, dtype=np.uint8) for blob in column])
+
+
+def kll_compact(
+    sketch: pd.DataFrame, k: int = KLL_K, seed: Optional[int] = 0
+) -> pd.DataFrame:
+    """
+    Compact a KLL sketch (columns `value` and `level`) until every level fits
+    its capacity: an over-full level is sorted and every other value, from a
+    random offset, moves up one level with twice the weight.
+    """
+    rng = np.random.default_rng(seed)
+    values = sketch["value"].to_numpy(dtype=np.float64)
+    level_of = sketch["level"].to_numpy(dtype=np.int64)
+    levels = [values[level_of == h] for h in range(level_of.max(initial=0) + 1)]
+
+    h = 0
+    while h < len(levels):
+        top = len(levels) - 1
+        capacity = max(2, math.ceil(k * KLL_DECAY ** (top - h)))
+        if len(levels[h]) <= capacity:
+            h += 1
+            continue
+        level = np.sort(levels[h])
+        # An odd value out stays behind so weights are conserved
+        keep = level[:1] if len(level) % 2 else level[:0]
+        promoted = level[len(keep) :][rng.integers(0, 2) :: 2]
+        levels[h] = keep
+        if h == top:
+            levels.append(promoted)
+        else:
+            levels[h + 1] = np.concatenate([levels[h + 1], promoted])
+        # Capacities of lower levels shrink when a level is added
+        h = 0
+
+    return pd.DataFrame(
+        {
+            "value": np.concatenate(levels),
+            "level": np.repeat(np.arange(len(levels)), [len(lv) for lv in levels]),
+        }
+    )
+
+
+def kll_sketch(values: np.ndarray, k: int = KLL_K) -> pd.DataFrame:
+    """Build a KLL sketch of `values`."""
+    sketch = pd.DataFrame({"value": np.asarray(values, dtype=np.float64), "level": 0})
+    return kll_compact(sketch, k)
+
+
+def kll_merge(sketches: Sequence[pd.DataFrame], k: int = KLL_K) -> pd.DataFrame:
+    """Merge KLL sketches of disjoint sets of values."""
+    return kll_compact(pd.concat(sketches, ignore_index=True), k)
+
+
+def kll_quantiles(sketch: pd.DataFrame, quantiles: Sequence[float]) -> np.ndarray:
+    """Estimated quantiles of the values summarized by a KLL sketch."""
+    order = np.argsort(sketch["value"].to_numpy(), kind="stable")
+    values = sketch["value"].to_numpy()[order]
+    weights = np.exp2(sketch["level"].to_numpy()[order])
+    cumulative = np.cumsum(weights)
+    positions = np.asarray(quantiles) * cumulative[-1]
+    index = np.searchsorted(cumulative, positions, side="left")
+    return values[np.minimum(index, len(values) - 1)]
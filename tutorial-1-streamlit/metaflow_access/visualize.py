@@ -1,71 +1,376 @@
 """
 Dataframe visualizer Streamlit app that takes Metaflow Flows/paths etc and then figures out 
 the artifacts that are dataframes and displays them in a table.
+
+Artifacts are listed from the metadata service only and are deserialized
+lazily, one tab at a time, so large runs open quickly.
 """
 
 import streamlit as st
 import pandas as pd
-from metaflow import Flow, namespace, Task
-from typing import List, Dict, Any
+import pyarrow as pa
+import pyarrow.parquet as pq
+from metaflow import DataArtifact, Flow, namespace, Task
+from columnar import is_table, read_table, table_info
+from profiling import profile_dataframe, profile_summary
+from typing import List, Dict, Any, Optional, Tuple, Union
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import math
+import os
+import tempfile
+import threading
+import time
 from datetime import datetime
 
 namespace(None)
 
+# Upper bound on concurrent datastore fetches when loading a whole run.
+MAX_FETCH_WORKERS = 16
+
+# Rows shown by the head/sample previews, and the page sizes for paged mode.
+PREVIEW_ROWS = 1000
+PAGE_SIZES = [100, 1000, 10000]
+
+# Fetched artifacts kept in memory, so the table info, preview, profile and
+# download of the artifacts on screen share one fetch.
+ARTIFACT_CACHE_ENTRIES = 4
+
+# Rows serialized at a time when preparing a download.
+EXPORT_CHUNK_ROWS = 100_000
+
+# Download format -> (file extension, MIME type)
+DOWNLOAD_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
 
-def get_top_runs(flow_name: str, n: int = 5) -> List[Dict[str, Any]]:
-    """Get the top N most recent runs for a given flow with additional metadata."""
+
+@st.cache_data(ttl=30, show_spinner=False)
+def get_top_runs(
+    flow_name: str, n: int = 5, page: int = 0, tags: Tuple[str, ...] = ()
+) -> List[Dict[str, Any]]:
+    """
+    Get a page of the N most recent runs for a given flow with additional metadata.
+    `Flow.runs()` already yields runs newest first, so we stop after the
+    requested page and only those runs pay for the per-run `finished` lookup.
+    """
     flow = Flow(flow_name)
     runs = []
-    for run in flow.runs():
-        created_at = run.created_at
+    for run in islice(flow.runs(*tags), page * n, (page + 1) * n):
         runs.append(
             {
                 "run_id": run.id,
-                "created_at": created_at,
+                "created_at": run.created_at,
                 "status": run.finished,
                 "tags": run.tags,
             }
         )
-    # Sort by created_at descending and take top N
-    return sorted(runs, key=lambda x: x["created_at"], reverse=True)[:n]
+    return runs
+
 
+def is_user_artifact(name: str) -> bool:
+    """Skip the bookkeeping artifacts Metaflow attaches to every task."""
+    return not name.startswith("_") and name != "name"
 
-def get_dataframe_from_pathspec(
-    flow_name: str, pathspec: str
-) -> Dict[str, pd.DataFrame]:
+
+@st.cache_data(ttl=60, show_spinner=False)
+def list_task_artifacts(pathspec: str) -> List[str]:
     """
-    Retrieve DataFrame artifacts from a specific pathspec.
-    Returns a dictionary of artifact name to dataframe.
+    List the artifact pathspecs of a single task.
+    Only the metadata service is queried; no artifact is deserialized.
     """
     try:
         task = Task(pathspec)
-        dataframes = {}
-
-        for key, value in task.data.items():
-            if isinstance(value, pd.DataFrame):
-                dataframes[key] = value
-
-        return dataframes
+        return [data_art.pathspec for data_art in task if is_user_artifact(data_art.id)]
     except Exception as e:
         st.error(f"Error accessing pathspec: {str(e)}")
-        return {}
+        return []
 
 
-def get_dataframe_artifacts(flow_name: str, run_id: str) -> Dict[str, pd.DataFrame]:
+@st.cache_data(ttl=60, show_spinner=False)
+def list_run_artifacts(flow_name: str, run_id: str) -> List[str]:
     """
-    Retrieve all dataframe artifacts from a specific flow run.
-    Returns a dictionary of artifact name to dataframe.
+    List the artifact pathspecs of every task in a flow run.
+    Only the metadata service is queried; no artifact is deserialized.
+    The short TTL lets runs that are still in progress pick up new tasks.
     """
     run = Flow(flow_name)[run_id]
-    dataframes = {}
+    return [
+        data_art.pathspec
+        for step in run
+        for task in step
+        for data_art in task
+        if is_user_artifact(data_art.id)
+    ]
+
+
+@st.cache_resource(show_spinner=False, max_entries=ARTIFACT_CACHE_ENTRIES)
+def load_artifact(pathspec: str) -> Union[bytes, pd.DataFrame, None]:
+    """
+    Load a single artifact and return it if it is a DataFrame or a Parquet
+    table (see columnar.py), else None. Only the last few are kept, which is
+    enough for one page view to fetch each artifact once.
+    A Parquet table is still one pickled artifact: the whole blob is
+    downloaded and unpickled, and only decoding it is partial.
+    """
+    value = DataArtifact(pathspec).data
+    return value if is_table(value) or isinstance(value, pd.DataFrame) else None
+
+
+@st.cache_data(show_spinner=False, max_entries=128)
+def get_table_info(pathspec: str) -> Optional[Dict[str, Any]]:
+    """Columns and row groups of a Parquet table artifact, else None."""
+    value = load_artifact(pathspec)
+    return table_info(value) if is_table(value) else None
+
+
+@st.cache_data(show_spinner=False, max_entries=128)
+def load_dataframe(
+    pathspec: str,
+    columns: Optional[Tuple[str, ...]] = None,
+    row_groups: Optional[Tuple[int, ...]] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    Load an artifact as a DataFrame, optionally restricted to some columns
+    and, for Parquet tables, some row groups. Returns None for artifacts
+    that are not tabular.
+    """
+    value = load_artifact(pathspec)
+    if is_table(value):
+        return read_table(value, columns=columns, row_groups=row_groups)
+    if value is None or columns is None:
+        return value
+    return value[list(columns)]
+
+
+def load_dataframes_parallel(
+    pathspecs: List[str], max_workers: int = MAX_FETCH_WORKERS
+) -> List[Dict[str, Any]]:
+    """
+    Warm the `load_dataframe` cache for many artifacts at once.
+    Every load is a blocking datastore fetch, so running them on a bounded
+    thread pool overlaps their latency instead of paying it once per artifact.
+    Returns one timing record per artifact, in completion order.
+    """
+    ctx = get_script_run_ctx()
+
+    def timed_load(pathspec: str) -> Dict[str, Any]:
+        add_script_run_ctx(threading.current_thread(), ctx)
+        start = time.perf_counter()
+        try:
+            is_dataframe, error = load_dataframe(pathspec) is not None, ""
+        except Exception as e:
+            is_dataframe, error = False, str(e)
+        return {
+            "artifact": pathspec,
+            "dataframe": is_dataframe,
+            "seconds": time.perf_counter() - start,
+            "error": error,
+        }
+
+    progress = st.progress(0.0, text="Loading artifacts...")
+    timings = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(timed_load, pathspec) for pathspec in pathspecs]
+        for future in as_completed(futures):
+            timings.append(future.result())
+            progress.progress(
+                len(timings) / len(futures),
+                text=f"Loaded {len(timings)}/{len(futures)} artifacts",
+            )
+    progress.empty()
+    return timings
+
+
+@st.cache_data(show_spinner=False, max_entries=128)
+def get_memory_usage(
+    pathspec: str,
+    columns: Optional[Tuple[str, ...]] = None,
+    row_groups: Optional[Tuple[int, ...]] = None,
+) -> pd.Series:
+    """
+    Deep per-column memory usage, in bytes, of a DataFrame artifact.
+    Deep introspection visits every object in object columns, so it is
+    computed once per pathspec rather than on every rerun.
+    """
+    return load_dataframe(pathspec, columns, row_groups).memory_usage(deep=True)
+
+
+@st.cache_data(show_spinner=False, max_entries=128)
+def get_profile(
+    pathspec: str,
+    columns: Optional[Tuple[str, ...]] = None,
+    row_groups: Optional[Tuple[int, ...]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Column profile of a DataFrame artifact, computed once per pathspec."""
+    return profile_dataframe(load_dataframe(pathspec, columns, row_groups))
+
 
-    for step in run:
-        for task in step:
-            for data_art in task:
-                if isinstance(data_art.data, pd.DataFrame):
-                    dataframes[data_art.pathspec] = data_art.data
+def format_stat(value: Any) -> str:
+    if isinstance(value, float):
+        return "" if math.isnan(value) else f"{value:,.6g}"
+    return str(value)
 
-    return dataframes
+
+def render_profile(
+    name: str,
+    columns: Optional[Tuple[str, ...]] = None,
+    row_groups: Optional[Tuple[int, ...]] = None,
+):
+    """Render the column profiling panel of a DataFrame artifact."""
+    with st.spinner("Profiling columns..."):
+        profiles = get_profile(name, columns, row_groups)
+    if not profiles:
+        st.info("This DataFrame has no columns to profile.")
+        return
+    # Statistics mix numbers and timestamps, so they are shown as text
+    st.dataframe(profile_summary(profiles).map(format_stat), use_container_width=True)
+
+    column = st.selectbox("Column", list(profiles), key=f"profile_column:{name}")
+    profile = profiles[column]
+    if "histogram" in profile:
+        counts, edges = profile["histogram"]
+        fmt = "{:.4g}" if isinstance(edges[0], float) else "{}"
+        labels = [
+            f"{fmt.format(low)} – {fmt.format(high)}"
+            for low, high in zip(edges[:-1], edges[1:])
+        ]
+        st.bar_chart(pd.Series(counts, index=pd.Index(labels, name=column)))
+    elif "top_values" in profile:
+        st.bar_chart(profile["top_values"])
+
+
+def export_dataframe(df: pd.DataFrame, fmt: str, path: str) -> None:
+    """
+    Write a DataFrame to the file `path` for download, EXPORT_CHUNK_ROWS rows
+    at a time, so only one chunk's intermediate representation is in memory.
+    """
+    chunk_starts = range(0, max(len(df), 1), EXPORT_CHUNK_ROWS)
+    if fmt == "CSV":
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            for start in chunk_starts:
+                df.iloc[start : start + EXPORT_CHUNK_ROWS].to_csv(
+                    f, index=False, header=start == 0
+                )
+    else:
+        # Inferred from the whole frame: a column that is all None in the
+        # first chunk would otherwise be typed null and reject later values
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+        with pq.ParquetWriter(path, schema) as writer:
+            for start in chunk_starts:
+                writer.write_table(
+                    pa.Table.from_pandas(
+                        df.iloc[start : start + EXPORT_CHUNK_ROWS],
+                        schema=schema,
+                        preserve_index=False,
+                    )
+                )
+
+
+def render_table_selection(
+    name: str, info: Dict[str, Any]
+) -> Tuple[Optional[Tuple[str, ...]], Optional[Tuple[int, ...]]]:
+    """
+    Let the user pick columns and a row group of a Parquet table artifact.
+    Returns the (columns, row_groups) to load; None means all of them.
+    """
+    st.caption(
+        f"Parquet table: {info['num_rows']:,} rows in "
+        f"{info['num_row_groups']:,} row groups"
+    )
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        selected = st.multiselect(
+            "Columns", info["columns"], default=info["columns"], key=f"columns:{name}"
+        )
+    with col2:
+        row_group = st.selectbox(
+            "Row group",
+            ["All", *range(info["num_row_groups"])],
+            key=f"row_group:{name}",
+        )
+    columns = None if selected == info["columns"] else tuple(selected)
+    row_groups = None if row_group == "All" else (row_group,)
+    return columns, row_groups
+
+
+def render_dataframe(
+    name: str,
+    df: pd.DataFrame,
+    columns: Optional[Tuple[str, ...]] = None,
+    row_groups: Optional[Tuple[int, ...]] = None,
+):
+    """Render one DataFrame artifact: a bounded preview, its info and downloads."""
+    # Only a slice of the frame is ever sent to the browser
+    mode = st.radio(
+        "Preview", ["Page", "Head", "Sample"], horizontal=True, key=f"mode:{name}"
+    )
+    if mode == "Page":
+        col1, col2 = st.columns(2)
+        with col1:
+            page_size = st.selectbox(
+                "Rows per page", PAGE_SIZES, key=f"page_size:{name}"
+            )
+        n_pages = max(1, math.ceil(len(df) / page_size))
+        with col2:
+            page = st.number_input(
+                f"Page (of {n_pages:,})", min_value=1, value=1, key=f"page:{name}"
+            )
+        start = (min(page, n_pages) - 1) * page_size
+        view = df.iloc[start : start + page_size]
+    elif mode == "Head":
+        view = df.head(PREVIEW_ROWS)
+    else:
+        view = df.sample(n=min(PREVIEW_ROWS, len(df)), random_state=0)
+
+    st.dataframe(view, use_container_width=True)
+    st.caption(f"Showing {len(view):,} of {len(df):,} rows")
+
+    # Show basic DataFrame info
+    memory = get_memory_usage(name, columns, row_groups)
+    st.write("DataFrame Info:")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.write(f"Shape: {df.shape}")
+    with col2:
+        st.write(f"Columns: {', '.join(map(str, df.columns))}")
+    with col3:
+        st.write(f"Memory Usage: {memory.sum() / 1024**2:.2f} MB")
+    with st.expander("Memory usage by column"):
+        st.dataframe(
+            (memory / 1024**2).rename("MB").to_frame(), use_container_width=True
+        )
+
+    if st.toggle("Profile columns", key=f"profile:{name}"):
+        render_profile(name, columns, row_groups)
+
+    # Downloads are only serialized when asked for, not on every rerun
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        fmt = st.selectbox("Download format", list(DOWNLOAD_FORMATS), key=f"fmt:{name}")
+    with col2:
+        extension, mime = DOWNLOAD_FORMATS[fmt]
+        if st.button(f"Prepare {fmt} download", key=f"export:{name}"):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, f"export.{extension}")
+                with st.spinner(f"Writing {fmt}..."):
+                    export_dataframe(df, fmt, path)
+                size_mb = os.path.getsize(path) / 1024**2
+                # download_button reads the file into memory to serve it
+                with open(path, "rb") as f:
+                    st.download_button(
+                        label=f"Download {fmt} ({size_mb:.2f} MB)",
+                        data=f,
+                        file_name=f"{name.replace('/', '_')}.{extension}",
+                        mime=mime,
+                        key=f"download:{name}",
+                    )
+            st.caption(
+                "The file is written to disk in chunks, but Streamlit holds the "
+                "finished download in memory until the page changes."
+            )
 
 
 # Set up the Streamlit page
@@ -85,10 +390,22 @@ if flow_name:
         help="Choose whether to select from recent runs or enter a specific pathspec",
     )
 
-    dataframes = {}
+    artifacts = []
 
     if selection_mode == "Recent Runs":
-        top_runs = get_top_runs(flow_name)
+        col1, col2, col3 = st.columns([3, 1, 1])
+        with col1:
+            tag_filter = st.text_input(
+                "Filter by tags",
+                help="Comma-separated; only runs with all of these tags are shown",
+            )
+        with col2:
+            page_size = st.selectbox("Runs per page", [5, 10, 25, 50])
+        with col3:
+            page = st.number_input("Page", min_value=1, value=1, step=1)
+
+        tags = tuple(t.strip() for t in tag_filter.split(",") if t.strip())
+        top_runs = get_top_runs(flow_name, n=page_size, page=page - 1, tags=tags)
         if top_runs:
             # Create a more informative selection box
             run_options = [
@@ -103,7 +420,9 @@ if flow_name:
 
             if selected_run_index is not None:
                 selected_run = top_runs[selected_run_index]
-                dataframes = get_dataframe_artifacts(flow_name, selected_run["run_id"])
+                artifacts = list_run_artifacts(flow_name, selected_run["run_id"])
+        elif page > 1:
+            st.warning(f"No runs on page {page} for flow: {flow_name}")
         else:
             st.warning(f"No runs found for flow: {flow_name}")
 
@@ -113,41 +432,58 @@ if flow_name:
             help="Format: run_id/step_name/task_id (e.g., 'run_123/start/1')",
         )
         if pathspec:
-            dataframes = get_dataframe_from_pathspec(flow_name, pathspec)
+            artifacts = list_task_artifacts(pathspec)
 
-    # Display DataFrames
-    if dataframes:
-        # Create tabs for each dataframe
-        tabs = st.tabs(list(dataframes.keys()))
+    # Display artifacts. Each one is only fetched from the datastore once
+    # its tab is switched on, so opening a large run stays cheap.
+    if artifacts:
+        if st.button(
+            f"Load all {len(artifacts)} artifacts",
+            help="Fetch every artifact in parallel instead of one tab at a time",
+        ):
+            start = time.perf_counter()
+            timings = load_dataframes_parallel(artifacts)
+            elapsed = time.perf_counter() - start
+            for name in artifacts:
+                st.session_state[f"load:{name}"] = True
+
+            with st.expander(
+                f"Loaded {len(timings)} artifacts in {elapsed:.2f}s "
+                f"({sum(t['seconds'] for t in timings):.2f}s of fetch time)"
+            ):
+                st.dataframe(
+                    pd.DataFrame(timings).sort_values("seconds", ascending=False),
+                    use_container_width=True,
+                    hide_index=True,
+                )
 
-        for tab, (name, df) in zip(tabs, dataframes.items()):
+        # Create tabs for each artifact
+        tabs = st.tabs(artifacts)
+
+        for tab, name in zip(tabs, artifacts):
             with tab:
                 st.subheader(f"Artifact: {name}")
-                st.dataframe(df, use_container_width=True)
-
-                # Show basic DataFrame info
-                st.write("DataFrame Info:")
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.write(f"Shape: {df.shape}")
-                with col2:
-                    st.write(f"Columns: {', '.join(df.columns)}")
-                with col3:
-                    st.write(
-                        f"Memory Usage: {df.memory_usage().sum() / 1024**2:.2f} MB"
-                    )
+                if not st.toggle("Load artifact", key=f"load:{name}"):
+                    continue
 
-                # Add download button for each DataFrame
-                csv = df.to_csv(index=False)
-                st.download_button(
-                    label="Download CSV",
-                    data=csv,
-                    file_name=f"{name.replace('/', '_')}.csv",
-                    mime="text/csv",
-                )
+                with st.spinner("Loading artifact..."):
+                    info = get_table_info(name)
+                columns, row_groups = None, None
+                if info is not None:
+                    columns, row_groups = render_table_selection(name, info)
+                    if columns == ():
+                        st.info("Select at least one column to load.")
+                        continue
+                with st.spinner("Loading artifact..."):
+                    df = load_dataframe(name, columns, row_groups)
+                if df is None:
+                    st.info("This artifact is not a DataFrame.")
+                    continue
+
+                render_dataframe(name, df, columns, row_groups)
     elif selection_mode == "Recent Runs" and not top_runs:
         pass  # Warning already shown
     elif selection_mode == "Custom Pathspec" and pathspec:
-        st.info("No DataFrame artifacts found in this pathspec.")
+        st.info("No artifacts found in this pathspec.")
 else:
     st.info("Please enter a flow name to begin.")
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""Benchmark dataset reads with and without the local dataset cache.
+
+Starts the Evidently UI twice against the same S3 bucket: once with plain
+`fsspec` dataset storage and once with `cached_fsspec` (dataset_cache.py).
+Each run uploads a synthetic dataset, clears the local cache, and times
+the dataset view (`GET /api/datasets/{id}`), which reads the file from
+dataset storage on every request.
+
+By default, S3 is a local moto server (`pip install "moto[server]" s3fs`).
+Pass --endpoint-url to use another S3-compatible store, such as MinIO:
+
+    python benchmark_dataset_cache.py --rows 300000 --reads 20
+
+Uploads are limited by the server's request body size (10 MB by default),
+which caps --rows at a few hundred thousand.
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import pyarrow as pa
+import requests
+import yaml
+
+from generate_config import dataset_storage_config
+from synthetic_data import classification_batches
+
+BUCKET = "evidently-benchmark"
+PORT = 8300
+
+
+def start_moto():
+    from moto.server import ThreadedMotoServer
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    return server, f"http://{host}:{port}"
+
+
+def wait_for(url: str, process: subprocess.Popen, timeout: float = 180) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Evidently exited with code {process.returncode}")
+        try:
+            if requests.get(f"{url}/api/version", timeout=2).ok:
+                return
+        except requests.ConnectionError:
+            pass
+        time.sleep(1)
+    raise TimeoutError(f"Evidently did not start at {url}")
+
+
+def run_mode(name: str, dataset_storage: Dict, workdir: str, env: Dict[str, str], df, reads: int) -> Dict:
+    """Serve Evidently with `dataset_storage`, upload `df` and time dataset views."""
+    from evidently import DataDefinition, Dataset
+    from evidently.ui.workspace import RemoteWorkspace
+
+    run_dir = os.path.join(workdir, name)
+    os.makedirs(run_dir)
+    conf_path = os.path.join(run_dir, "config.yaml")
+    with open(conf_path, "w") as f:
+        yaml.dump(
+            {
+                "storage": {"type": "sql"},
+                "database": {"url": f"sqlite:///{run_dir}/evidently.db"},
+                "dataset_storage": dataset_storage,
+            },
+            f,
+        )
+
+    url = f"http://localhost:{PORT}"
+    here = os.path.dirname(os.path.abspath(__file__))
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(here, "run_evidently.py"), "--port", str(PORT), "--conf-path", conf_path],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(url, server)
+        ws = RemoteWorkspace(url)
+        project = ws.create_project(f"dataset-cache-{name}")
+        project.save()
+        dataset = Dataset.from_pandas(df, data_definition=DataDefinition())
+        start = time.perf_counter()
+        dataset_id = ws.add_dataset(project.id, dataset, name="synthetic")
+        upload_s = time.perf_counter() - start
+
+        # Start cold: the first view must come from S3 in both modes
+        if "cache_dir" in dataset_storage:
+            shutil.rmtree(dataset_storage["cache_dir"], ignore_errors=True)
+            os.makedirs(dataset_storage["cache_dir"])
+
+        latencies: List[float] = []
+        with requests.Session() as session:
+            for _ in range(reads):
+                start = time.perf_counter()
+                response = session.get(f"{url}/api/datasets/{dataset_id}", params={"page_size": 100}, timeout=300)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        "mode": name,
+        "upload_s": upload_s,
+        "first_ms": latencies[0] * 1000,
+        "warm_p50_ms": statistics.median(latencies[1:]) * 1000 if reads > 1 else float("nan"),
+        "warm_max_ms": max(latencies[1:]) * 1000 if reads > 1 else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local dataset cache against S3")
+    parser.add_argument("--rows", type=int, default=300_000, help="Rows in the synthetic dataset")
+    parser.add_argument("--reads", type=int, default=20, help="Dataset views per mode")
+    parser.add_argument("--endpoint-url", default=None, help="S3 endpoint (default: a local moto server)")
+    parser.add_argument("--bucket", default=BUCKET)
+    args = parser.parse_args()
+
+    moto = None
+    endpoint_url = args.endpoint_url
+    if endpoint_url is None:
+        moto, endpoint_url = start_moto()
+    env = {
+        **os.environ,
+        # fsspec passes FSSPEC_S3_* variables to s3fs
+        "FSSPEC_S3_ENDPOINT_URL": endpoint_url,
+        "AWS_ACCESS_KEY_ID": os.environ.get("AWS_ACCESS_KEY_ID", "testing"),
+        "AWS_SECRET_ACCESS_KEY": os.environ.get("AWS_SECRET_ACCESS_KEY", "testing"),
+    }
+
+    import s3fs
+
+    s3 = s3fs.S3FileSystem(
+        key=env["AWS_ACCESS_KEY_ID"], secret=env["AWS_SECRET_ACCESS_KEY"], endpoint_url=endpoint_url
+    )
+    if not s3.exists(args.bucket):
+        s3.mkdir(args.bucket)
+
+    df = pa.Table.from_batches(list(classification_batches(args.rows))).to_pandas()
+    print(f"Dataset: {len(df):,} rows, {df.memory_usage().sum() / 1024**2:.0f} MB in memory")
+
+    workdir = tempfile.mkdtemp(prefix="evidently-cache-bench-")
+    try:
+        path = f"s3://{args.bucket}/{os.path.basename(workdir)}"
+        results = [
+            run_mode("fsspec", dataset_storage_config(path, 0), workdir, env, df, args.reads),
+            run_mode(
+                "cached_fsspec",
+                dataset_storage_config(path, cache_dir=os.path.join(workdir, "cache")),
+                workdir,
+                env,
+                df,
+                args.reads,
+            ),
+        ]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        if moto is not None:
+            moto.stop()
+
+    print(f"\n{'Dataset storage':<16}{'upload s':>10}{'first ms':>10}{'warm p50 ms':>13}{'warm max ms':>13}")
+    for r in results:
+        print(
+            f"{r['mode']:<16}{r['upload_s']:>10.2f}{r['first_ms']:>10.0f}"
+            f"{r['warm_p50_ms']:>13.0f}{r['warm_max_ms']:>13.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Local read-through disk cache for Evidently dataset storage.
+
+With `dataset_storage` on S3, Evidently fetches a dataset file from S3
+every time a page or report needs its content. The `cached_fsspec`
+dataset storage keeps a copy of every file it reads or writes under a
+local directory, so repeated reads are served from disk. Dataset files
+are immutable once written (their blob ids contain the dataset id), so
+cached copies never go stale. The cache holds at most `cache_size_mb`;
+the least recently used files are evicted first.
+
+generate_config.py writes it as:
+
+    dataset_storage:
+      type: cached_fsspec
+      path: s3://bucket/ob-evidently/workspace
+      cache_dir: /tmp/evidently-dataset-cache
+      cache_size_mb: 1024
+
+Workers started by run_evidently.py share the directory: files are
+written under a temporary name and renamed into place, and a file
+evicted by one worker stays readable by another that already opened it.
+"""
+
+import contextlib
+import hashlib
+import os
+import shutil
+import threading
+from typing import Callable, Iterator, IO, List, Tuple
+
+from evidently.ui.service.base import BlobStorage
+from evidently.ui.service.components.storage import DatasetFileStorageComponent
+from evidently.ui.service.storage.local.base import FSSpecBlobStorage
+
+CACHE_DIR = os.environ.get(
+    "EVIDENTLY_DATASET_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "evidently-datasets"),
+)
+CACHE_SIZE_MB = 1024
+
+COPY_BUFFER_BYTES = 8 * 1024**2
+
+
+class CachedBlobStorage(FSSpecBlobStorage):
+    """FSSpecBlobStorage that reads through, and writes through, a local LRU cache."""
+
+    def __init__(self, base_path: str, cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_SIZE_MB * 1024**2):
+        super().__init__(base_path)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def cache_path(self, blob_id: str) -> str:
+        digest = hashlib.sha256(f"{self.base_path}\n{blob_id}".encode("utf8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.blob")
+
+    def _temp_path(self, path: str) -> str:
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    @contextlib.contextmanager
+    def open_blob(self, blob_id: str) -> Iterator[IO]:
+        path = self.cache_path(blob_id)
+        try:
+            f = open(path, "rb")
+            self.hits += 1
+            with contextlib.suppress(FileNotFoundError):
+                os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            self.misses += 1
+            f = self._fetch(blob_id, path)
+        with f:
+            yield f
+
+    def _fetch(self, blob_id: str, path: str) -> IO:
+        """Download a blob into the cache and return it opened for reading."""
+        tmp_path = self._temp_path(path)
+        with self.location.open(blob_id, "rb") as src, open(tmp_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, COPY_BUFFER_BYTES)
+        f = open(tmp_path, "rb")
+        if os.path.getsize(tmp_path) > self.max_bytes:
+            # Too large to cache: serve this read from the open file only
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+            self.evict()
+        return f
+
+    async def put_blob(self, blob_id: str, obj) -> str:
+        blob_id = await super().put_blob(blob_id, obj)
+        path = self.cache_path(blob_id)
+        data = obj.encode("utf8") if isinstance(obj, str) else obj
+        if len(data) <= self.max_bytes:
+            # Freshly uploaded datasets are usually viewed next
+            tmp_path = self._temp_path(path)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self.evict()
+        else:
+            self._discard(path)
+        return blob_id
+
+    async def delete_blob(self, blob_id: str):
+        await super().delete_blob(blob_id)
+        self._discard(self.cache_path(blob_id))
+
+    def _discard(self, path: str) -> None:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+    def cached_files(self) -> List[Tuple[float, int, str]]:
+        """(last use, size, path) of every cached file."""
+        files = []
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".blob"):
+                    continue
+                with contextlib.suppress(FileNotFoundError):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def evict(self) -> int:
+        """Remove least recently used files until the cache fits; returns bytes freed."""
+        files = self.cached_files()
+        excess = sum(size for _, size, _ in files) - self.max_bytes
+        freed = 0
+        for _, size, path in sorted(files):
+            if freed >= excess:
+                break
+            self._discard(path)
+            freed += size
+        return freed
+
+
+class CachedFSSpecDatasetFileStorageComponent(DatasetFileStorageComponent):
+    """`dataset_storage` on any fsspec path, behind a local disk cache."""
+
+    class Config:
+        type_alias = "cached_fsspec"
+
+    path: str
+    cache_dir: str = CACHE_DIR
+    cache_size_mb: int = CACHE_SIZE_MB
+
+    def dependency_factory(self) -> Callable[..., BlobStorage]:
+        def blob_storage_factory() -> BlobStorage:
+            return CachedBlobStorage(self.path, self.cache_dir, self.cache_size_mb * 1024**2)
+
+        return blob_storage_factory
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""Streaming drift monitor for production prediction logs.
+
+Tails JSONL and Parquet prediction logs written by inference endpoints,
+buckets records into tumbling time windows and, as each window closes,
+computes a drift and performance report against a reference dataset and
+pushes it to an Evidently workspace.
+
+Memory stays bounded: only open windows are buffered, and each keeps a
+uniform reservoir sample of at most --max-window-rows records.
+
+`simulate` writes synthetic prediction logs to a local directory, which
+stands in for the inference endpoints' log sink in tests:
+
+    python drift_monitor.py simulate --out sim/
+    python drift_monitor.py run --logs sim/logs/ --reference sim/reference.parquet \\
+        --task classification --workspace-dir workspace/ --once
+"""
+
+import argparse
+import datetime
+import glob
+import io
+import json
+import os
+import time
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from populate_data import (
+    BinaryClassification,
+    ClassificationPreset,
+    DataDefinition,
+    DataDriftPreset,
+    Dataset,
+    Regression,
+    RegressionPreset,
+    RemoteWorkspace,
+    Report,
+    generate_classification_data,
+    generate_regression_data,
+    get_auth_token,
+    upload_snapshot,
+)
+from reference_sample import load_reference
+from evidently.ui.workspace import Workspace
+
+WINDOW = "1h"
+MAX_WINDOW_ROWS = 50_000
+BATCH_ROWS = 10_000
+POLL_SECONDS = 5.0
+
+
+class LogTailer:
+    """Reads new records from the JSONL and Parquet files under a path."""
+
+    def __init__(self, path: str, batch_rows: int = BATCH_ROWS):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.offsets: Dict[str, int] = {}
+        self.parquet_done = set()
+
+    def files(self) -> List[str]:
+        if os.path.isfile(self.path):
+            return [self.path]
+        patterns = ["*.jsonl", "*.json", "*.parquet"]
+        return sorted(f for p in patterns for f in glob.glob(os.path.join(self.path, "**", p), recursive=True))
+
+    def poll(self) -> Iterator[pd.DataFrame]:
+        """Yield batches of records added since the last poll."""
+        for path in self.files():
+            if path.endswith(".parquet"):
+                yield from self._read_parquet(path)
+            else:
+                yield from self._read_jsonl(path)
+
+    def _read_jsonl(self, path: str) -> Iterator[pd.DataFrame]:
+        offset = self.offsets.get(path, 0)
+        if os.path.getsize(path) < offset:
+            # Truncated or rotated: start over
+            offset = 0
+        with open(path, "rb") as f:
+            f.seek(offset)
+            while True:
+                lines = f.readlines(self.batch_rows * 256)
+                # A line without a newline is still being written. readlines()
+                # has read past it, so stop here; the next poll resumes at offset
+                partial = bool(lines) and not lines[-1].endswith(b"\n")
+                if partial:
+                    lines.pop()
+                if lines:
+                    offset += sum(len(line) for line in lines)
+                    self.offsets[path] = offset
+                    df = self._parse_jsonl(path, lines)
+                    if len(df):
+                        yield df
+                if partial or not lines:
+                    break
+
+    @staticmethod
+    def _parse_jsonl(path: str, lines: List[bytes]) -> pd.DataFrame:
+        try:
+            return pd.read_json(io.BytesIO(b"".join(lines)), lines=True)
+        except ValueError:
+            pass
+        # Skip malformed records rather than stop the monitor
+        valid = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if isinstance(record, dict):
+                valid.append(line if line.endswith(b"\n") else line + b"\n")
+            else:
+                print(f"Skipping malformed record in {path}: {line[:200]!r}")
+        if not valid:
+            return pd.DataFrame()
+        return pd.read_json(io.BytesIO(b"".join(valid)), lines=True)
+
+    def _read_parquet(self, path: str) -> Iterator[pd.DataFrame]:
+        if path in self.parquet_done:
+            return
+        try:
+            parquet_file = pq.ParquetFile(path)
+        except (pa.ArrowInvalid, OSError):
+            # Not completely written yet; try again on the next poll
+            return
+        self.parquet_done.add(path)
+        for batch in parquet_file.iter_batches(batch_size=self.batch_rows):
+            yield batch.to_pandas()
+
+
+class WindowBuffer:
+    """Records of one time window, reservoir-sampled down to `max_rows`."""
+
+    def __init__(self, max_rows: int = MAX_WINDOW_ROWS, seed: int = 0):
+        self.max_rows = max_rows
+        self.rng = np.random.default_rng(seed)
+        self.sample: Optional[pd.DataFrame] = None
+        self.rows = 0
+
+    def add(self, df: pd.DataFrame):
+        df = df.reset_index(drop=True)
+        free = self.max_rows - (0 if self.sample is None else len(self.sample))
+        head, rest = df.iloc[:free], df.iloc[free:]
+        self.sample = head if self.sample is None else pd.concat([self.sample, head], ignore_index=True)
+        self.rows += len(head)
+        if len(rest):
+            # Algorithm R, vectorized: row k replaces a random slot with
+            # probability max_rows / (k + 1); later rows win ties
+            seen = self.rows + np.arange(len(rest))
+            slots = self.rng.integers(0, seen + 1)
+            accepted = np.flatnonzero(slots < self.max_rows)
+            take = np.arange(len(self.sample))
+            take[slots[accepted]] = len(self.sample) + accepted
+            self.sample = pd.concat([self.sample, rest], ignore_index=True).take(take).reset_index(drop=True)
+            self.rows += len(rest)
+
+
+class DriftMonitor:
+    """Buckets records into windows and reports each window as it closes."""
+
+    def __init__(
+        self,
+        ws,
+        project_id,
+        reference: Dataset,
+        data_definition: DataDefinition,
+        presets: list,
+        window: str = WINDOW,
+        lateness: str = "0s",
+        timestamp_column: str = "timestamp",
+        max_window_rows: int = MAX_WINDOW_ROWS,
+    ):
+        self.ws = ws
+        self.project_id = project_id
+        self.reference = reference
+        self.data_definition = data_definition
+        self.presets = presets
+        self.window = pd.Timedelta(window)
+        self.lateness = pd.Timedelta(lateness)
+        self.timestamp_column = timestamp_column
+        self.max_window_rows = max_window_rows
+        self.windows: Dict[pd.Timestamp, WindowBuffer] = {}
+        self.watermark: Optional[pd.Timestamp] = None
+        self.closed_until: Optional[pd.Timestamp] = None
+        self.late_rows = 0
+
+    def ingest(self, df: pd.DataFrame):
+        """Add a batch of records and close every window the watermark passed."""
+        if df.empty:
+            return
+        timestamps = pd.to_datetime(df[self.timestamp_column])
+        starts = timestamps.dt.floor(self.window)
+        if self.closed_until is not None:
+            late = starts < self.closed_until
+            self.late_rows += int(late.sum())
+            df, starts, timestamps = df[~late], starts[~late], timestamps[~late]
+        for start, records in df.groupby(starts, sort=True):
+            if start not in self.windows:
+                self.windows[start] = WindowBuffer(self.max_window_rows, seed=int(start.value % 2**32))
+            self.windows[start].add(records)
+        if len(timestamps):
+            latest = timestamps.max()
+            self.watermark = latest if self.watermark is None else max(self.watermark, latest)
+            self.close_windows(self.watermark - self.lateness)
+
+    def close_windows(self, until: Optional[pd.Timestamp] = None):
+        """Report and drop windows ending at or before `until` (all if None)."""
+        for start in sorted(self.windows):
+            end = start + self.window
+            if until is not None and end > until:
+                break
+            self.push(start, self.windows.pop(start))
+            self.closed_until = end
+
+    def push(self, start: pd.Timestamp, buffer: WindowBuffer):
+        end = start + self.window
+        # Timestamps only place records in windows; the reference has none
+        records = buffer.sample.drop(columns=[self.timestamp_column])
+        current = Dataset.from_pandas(records, data_definition=self.data_definition)
+        report = Report(
+            [preset() for preset in self.presets],
+            metadata={"window_start": start.isoformat(), "window_end": end.isoformat(), "rows": str(buffer.rows)},
+            tags=["streaming"],
+        )
+        snapshot = report.run(reference_data=self.reference, current_data=current)
+        snapshot._timestamp = start.to_pydatetime()
+        upload_snapshot(self.ws, self.project_id, snapshot)
+        print(f"  Window {start} - {end}: {buffer.rows} records ({len(buffer.sample)} in report), pushed")
+
+
+def read_records(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_json(path, lines=True)
+
+
+def build_data_definition(
+    reference_df: pd.DataFrame, task: str, target: str, prediction: str, timestamp_column: str
+) -> DataDefinition:
+    """Numerical columns of the reference, plus the task's target/prediction."""
+    numerical = [
+        c
+        for c in reference_df.select_dtypes("number").columns
+        if c not in (target, prediction, timestamp_column)
+    ]
+    categorical = [
+        c
+        for c in reference_df.columns
+        if c not in numerical and c not in (target, prediction, timestamp_column)
+    ]
+    if task == "classification":
+        return DataDefinition(
+            numerical_columns=numerical,
+            categorical_columns=categorical or None,
+            classification=[BinaryClassification(target=target, prediction_labels=prediction)],
+        )
+    return DataDefinition(
+        numerical_columns=numerical,
+        categorical_columns=categorical or None,
+        regression=[Regression(target=target, prediction=prediction)],
+    )
+
+
+def get_project_id(ws, name: str, task: str):
+    """ID of the project called `name`, created if it does not exist."""
+    projects = ws.search_project(name)
+    if projects:
+        return projects[0].id
+    project = ws.create_project(name, description=f"Streaming {task} monitoring from prediction logs.")
+    project.save()
+    print(f"Created project {name}: {project.id}")
+    return project.id
+
+
+def run(args):
+    if args.workspace_dir:
+        ws = Workspace(args.workspace_dir)
+    else:
+        ws = RemoteWorkspace(base_url=args.url, secret=get_auth_token())
+
+    reference_df = read_records(args.reference)
+    data_def = build_data_definition(reference_df, args.task, args.target, args.prediction, args.timestamp_column)
+    stat = os.stat(args.reference)
+    reference = load_reference(
+        f"{os.path.abspath(args.reference)}-{stat.st_size}-{int(stat.st_mtime)}",
+        data_def,
+        lambda: reference_df.drop(columns=[args.timestamp_column], errors="ignore"),
+        max_rows=args.reference_sample_rows,
+    )
+    presets = [DataDriftPreset, ClassificationPreset if args.task == "classification" else RegressionPreset]
+    monitor = DriftMonitor(
+        ws,
+        get_project_id(ws, args.project, args.task),
+        reference,
+        data_def,
+        presets,
+        window=args.window,
+        lateness=args.lateness,
+        timestamp_column=args.timestamp_column,
+        max_window_rows=args.max_window_rows,
+    )
+
+    tailer = LogTailer(args.logs)
+    print(f"Tailing {args.logs} in {args.window} windows")
+    try:
+        while True:
+            for batch in tailer.poll():
+                monitor.ingest(batch)
+            if args.once:
+                break
+            time.sleep(args.poll_seconds)
+    except KeyboardInterrupt:
+        pass
+    # Whatever is still open is reported as is
+    monitor.close_windows()
+    if monitor.late_rows:
+        print(f"Dropped {monitor.late_rows} records that arrived after their window closed")
+
+
+def simulate(args):
+    """Write a reference file and JSONL prediction logs, drifting in the last windows."""
+    os.makedirs(os.path.join(args.out, "logs"), exist_ok=True)
+    generate = generate_classification_data if args.task == "classification" else generate_regression_data
+    generate(n_samples=args.reference_rows, drift=False, seed=42).to_parquet(
+        os.path.join(args.out, "reference.parquet"), index=False
+    )
+
+    start = pd.Timestamp(datetime.datetime.now()).floor(args.window) - args.windows * pd.Timedelta(args.window)
+    log_path = os.path.join(args.out, "logs", "predictions.jsonl")
+    # Each run replaces the previous run's log rather than adding its windows again
+    with open(log_path, "w") as f:
+        for window in range(args.windows):
+            df = generate(n_samples=args.rows_per_window, drift=window >= args.windows - 2, seed=100 + window)
+            offsets = np.sort(np.random.default_rng(window).uniform(0, 1, len(df)))
+            df.insert(0, "timestamp", start + (window + offsets) * pd.Timedelta(args.window))
+            df.to_json(f, orient="records", lines=True, date_format="iso")
+            # Visible to a running tailer before the next window
+            f.flush()
+            print(f"  Wrote window {window + 1}/{args.windows}: {len(df)} records")
+            time.sleep(args.delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming drift monitor for prediction logs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Tail prediction logs and push a report per window")
+    run_parser.add_argument("--logs", required=True, help="JSONL/Parquet log file or directory")
+    run_parser.add_argument("--reference", required=True, help="Reference dataset (Parquet or JSONL)")
+    run_parser.add_argument("--task", choices=["classification", "regression"], default="classification")
+    run_parser.add_argument("--target", default="target")
+    run_parser.add_argument("--prediction", default="prediction")
+    run_parser.add_argument("--timestamp-column", default="timestamp")
+    run_parser.add_argument("--project", default="Streaming Model Monitoring", help="Project name (created if missing)")
+    run_parser.add_argument("--window", default=WINDOW, help="Window length, e.g. 15min, 1h, 1d")
+    run_parser.add_argument("--lateness", default="0s", help="How long to wait for late records before closing a window")
+    run_parser.add_argument("--max-window-rows", type=int, default=MAX_WINDOW_ROWS, help="Records sampled per window")
+    run_parser.add_argument(
+        "--reference-sample-rows", type=int, default=None, help="Sample a larger reference down to this many rows"
+    )
+    run_parser.add_argument("--poll-seconds", type=float, default=POLL_SECONDS)
+    run_parser.add_argument("--once", action="store_true", help="Process the current logs, report all windows and exit")
+    target = run_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Evidently API URL")
+    target.add_argument("--workspace-dir", help="Local Evidently workspace directory instead of a server")
+
+    sim_parser = commands.add_parser("simulate", help="Write synthetic prediction logs to a directory")
+    sim_parser.add_argument("--out", required=True)
+    sim_parser.add_argument("--task", choices=["classification", "regression"], default="classification")
+    sim_parser.add_argument("--windows", type=int, default=6)
+    sim_parser.add_argument("--window", default=WINDOW)
+    sim_parser.add_argument("--rows-per-window", type=int, default=500)
+    sim_parser.add_argument("--reference-rows", type=int, default=1000)
+    sim_parser.add_argument("--delay", type=float, default=0.0, help="Seconds between windows, to watch `run` live")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        simulate(args)
+
+
+if __name__ == "__main__":
+    main()
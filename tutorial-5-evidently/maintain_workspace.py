@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""Apply snapshot retention to the Evidently workspace database.
+
+Every populate or monitoring run adds snapshots, and with them metric
+points and snapshot blobs, so the database and dashboard queries grow
+without bound. This tool downsamples each project's history, separately
+for every kind of report in it (a drift and a performance report uploaded
+for the same period are kept or removed independently):
+
+- snapshots from the last --daily-days days (default 30): the latest
+  snapshot of each day is kept
+- older snapshots: the latest snapshot of each ISO week is kept
+- with --expire-days, snapshots older than that are removed entirely
+
+A report's kind is its snapshot name, tags and the metric types it
+computed. Snapshots left behind by deleted projects (SQLite does not
+cascade the project delete) are listed on their own and all removed.
+
+Removing a snapshot also removes its metric points, dataset links and
+blob, which the API's snapshot delete leaves behind. Datasets are not
+touched. Afterwards the database is vacuumed, and the tool reports the
+storage reclaimed and the latency of the dashboard's queries before and
+after.
+
+It reads the same config as run_evidently.py. Without --apply it only
+prints the plan:
+
+    python maintain_workspace.py --conf-path evidently_config.yaml
+    python maintain_workspace.py --conf-path evidently_config.yaml --apply
+
+PostgreSQL's plain VACUUM makes the freed space reusable by new rows but
+rarely returns it to the OS; --full does, but locks each table while it
+is rewritten, so run it when the UI is idle.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import posixpath
+import statistics
+import time
+from typing import Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from evidently.ui.service.base import SeriesFilter
+from evidently.ui.service.storage.sql.components import SQLStorageComponent
+from evidently.ui.service.storage.sql.data import SQLDataStorage
+from evidently.ui.service.storage.sql.metadata import SQLProjectMetadataStorage
+from evidently.ui.service.storage.sql.models import (
+    BlobSQLModel,
+    PointSQLModel,
+    ProjectSQLModel,
+    SnapshotDatasetsSQLModel,
+    SnapshotSQLModel,
+)
+from evidently.ui.service.type_aliases import ProjectID, SnapshotID
+from sqlalchemy import Engine, delete, inspect, select, text
+from sqlalchemy.orm import Session
+
+from run_evidently import load_config
+
+DAILY_DAYS = 30
+
+# Snapshots removed per transaction
+BATCH_SIZE = 500
+
+# Tables whose size is reported and which are vacuumed
+TABLES = ("snapshots", "points", "blobs", "snapshot_datasets")
+
+
+class SnapshotRow(NamedTuple):
+    id: SnapshotID
+    project_id: ProjectID
+    timestamp: datetime.datetime
+    blob_size: int
+    # Name, tags and metric types: what makes two snapshots the same kind of report
+    kind: Tuple[Optional[str], Tuple[str, ...], FrozenSet[str]] = (None, (), frozenset())
+
+
+def snapshot_blob_id(project_id: ProjectID, snapshot_id: SnapshotID) -> str:
+    # Where ProjectManager stores snapshots; `snapshots.blob_path` holds a different path
+    return posixpath.join(str(project_id), "snapshots", str(snapshot_id)) + ".json"
+
+
+def as_utc(timestamp: datetime.datetime) -> datetime.datetime:
+    """Naive UTC timestamp, whether or not the database kept the zone."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def retention_bucket(
+    timestamp: datetime.datetime, now: datetime.datetime, daily_days: int, expire_days: Optional[int]
+) -> Optional[tuple]:
+    """The day or ISO week a snapshot is downsampled into, or None if it expired."""
+    age = now - timestamp
+    if expire_days is not None and age > datetime.timedelta(days=expire_days):
+        return None
+    if age <= datetime.timedelta(days=daily_days):
+        return ("day", timestamp.date())
+    year, week, _ = timestamp.isocalendar()
+    return ("week", year, week)
+
+
+def plan_retention(
+    snapshots: Iterable[SnapshotRow],
+    now: datetime.datetime,
+    daily_days: int = DAILY_DAYS,
+    expire_days: Optional[int] = None,
+) -> List[SnapshotRow]:
+    """Snapshots to remove: all but the latest of each report kind's days and weeks, per project."""
+    kept = set()
+    remove = []
+    for snapshot in sorted(snapshots, key=lambda s: s.timestamp, reverse=True):
+        bucket = retention_bucket(snapshot.timestamp, now, daily_days, expire_days)
+        key = (snapshot.project_id, snapshot.kind, bucket)
+        if bucket is None or key in kept:
+            remove.append(snapshot)
+        else:
+            kept.add(key)
+    return remove
+
+
+def load_snapshots(engine: Engine, project_ids: Optional[List[ProjectID]] = None) -> List[SnapshotRow]:
+    query = select(
+        SnapshotSQLModel.id,
+        SnapshotSQLModel.project_id,
+        SnapshotSQLModel.timestamp,
+        SnapshotSQLModel.name,
+        SnapshotSQLModel.tags,
+    )
+    points = select(PointSQLModel.snapshot_id, PointSQLModel.metric_type).distinct()
+    if project_ids is not None:
+        query = query.where(SnapshotSQLModel.project_id.in_(project_ids))
+        points = points.where(PointSQLModel.project_id.in_(project_ids))
+    with Session(engine) as session:
+        rows = session.execute(query).all()
+        metric_types: Dict[SnapshotID, set] = {}
+        for snapshot_id, metric_type in session.execute(points):
+            metric_types.setdefault(snapshot_id, set()).add(metric_type)
+        blob_sizes = dict(
+            session.execute(
+                select(BlobSQLModel.id, BlobSQLModel.size).where(BlobSQLModel.id.like("%/snapshots/%"))
+            ).all()
+        )
+    return [
+        SnapshotRow(
+            id_,
+            project_id,
+            as_utc(timestamp),
+            blob_sizes.get(snapshot_blob_id(project_id, id_), 0),
+            (name, tuple(sorted(tags or ())), frozenset(metric_types.get(id_, ()))),
+        )
+        for id_, project_id, timestamp, name, tags in rows
+    ]
+
+
+def existing_projects(engine: Engine) -> set:
+    with Session(engine) as session:
+        return set(session.execute(select(ProjectSQLModel.id)).scalars())
+
+
+def resolve_projects(engine: Engine, names_or_ids: List[str]) -> List[ProjectID]:
+    """Project ids for the given project names or ids."""
+    with Session(engine) as session:
+        projects = session.execute(select(ProjectSQLModel.id, ProjectSQLModel.name)).all()
+    ids = []
+    for wanted in names_or_ids:
+        matches = [id_ for id_, name in projects if wanted in (str(id_), name)]
+        if not matches:
+            raise ValueError(f"No project named {wanted!r}")
+        ids.extend(matches)
+    return ids
+
+
+def delete_snapshots(engine: Engine, snapshots: List[SnapshotRow], batch_size: int = BATCH_SIZE) -> None:
+    """Remove snapshots with their points, dataset links and blobs."""
+    for start in range(0, len(snapshots), batch_size):
+        batch = snapshots[start : start + batch_size]
+        ids = [s.id for s in batch]
+        # Deleted explicitly: SQLite does not enforce the ON DELETE CASCADE
+        # foreign keys unless each connection enables them
+        with Session(engine) as session, session.begin():
+            session.execute(delete(PointSQLModel).where(PointSQLModel.snapshot_id.in_(ids)))
+            session.execute(delete(SnapshotDatasetsSQLModel).where(SnapshotDatasetsSQLModel.snapshot_id.in_(ids)))
+            session.execute(delete(SnapshotSQLModel).where(SnapshotSQLModel.id.in_(ids)))
+            session.execute(delete(BlobSQLModel).where(BlobSQLModel.id.in_([snapshot_blob_id(s.project_id, s.id) for s in batch])))
+
+
+def storage_bytes(engine: Engine) -> int:
+    """Bytes the database occupies on disk (PostgreSQL: the Evidently tables and their indexes)."""
+    if engine.url.get_backend_name() == "sqlite":
+        path = engine.url.database
+        return sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p))
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT coalesce(sum(pg_total_relation_size(to_regclass(t))), 0) FROM unnest(:tables) AS t"),
+            {"tables": list(TABLES)},
+        ).scalar_one()
+
+
+def vacuum(engine: Engine, full: bool = False) -> None:
+    """Rewrite the database so deleted rows stop costing space and scan time."""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if engine.url.get_backend_name() == "sqlite":
+            conn.exec_driver_sql("VACUUM")
+            conn.exec_driver_sql("ANALYZE")
+            # Fold the WAL back into the database file and truncate it
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+            return
+        # The config's statement timeout is meant for requests, not maintenance
+        conn.exec_driver_sql("SET statement_timeout = 0")
+        for table in TABLES:
+            conn.exec_driver_sql(f"VACUUM {'(FULL, ANALYZE)' if full else '(ANALYZE)'} {table}")
+
+
+def query_latency(engine: Engine, project_ids: Optional[List[ProjectID]] = None, repeats: int = 5) -> Dict[str, float]:
+    """Median seconds, summed over projects, of the queries behind each dashboard view."""
+    metadata = SQLProjectMetadataStorage(engine)
+    data = SQLDataStorage(engine)
+    every_series = [SeriesFilter(tags=[], metadata={}, metric="*", metric_labels={})]
+    queries: Dict[str, Callable] = {
+        "list_snapshots": lambda project_id: metadata.list_snapshots(project_id),
+        "get_metrics": lambda project_id: data.get_metrics(project_id, [], {}),
+        "get_data_series": lambda project_id: data.get_data_series(project_id, every_series, None, None),
+    }
+    if project_ids is None:
+        project_ids = [p.id for p in asyncio.run(metadata.list_projects(None))]
+
+    async def measure(query) -> float:
+        total = 0.0
+        for project_id in project_ids:
+            samples = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                await query(project_id)
+                samples.append(time.perf_counter() - start)
+            total += statistics.median(samples)
+        return total
+
+    return {name: asyncio.run(measure(query)) for name, query in queries.items()}
+
+
+def format_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def maintain(
+    conf_path: str,
+    apply: bool = False,
+    daily_days: int = DAILY_DAYS,
+    expire_days: Optional[int] = None,
+    projects: Optional[List[str]] = None,
+    run_vacuum: bool = True,
+    full: bool = False,
+    repeats: int = 5,
+    now: Optional[datetime.datetime] = None,
+) -> dict:
+    config = load_config(conf_path=conf_path)
+    if not isinstance(config.storage, SQLStorageComponent):
+        raise ValueError(f"{conf_path} does not use SQL storage")
+    engine = config.additional_components["database"].get_engine()
+    if not inspect(engine).has_table(SnapshotSQLModel.__tablename__):
+        print("No snapshots yet: the database has not been migrated")
+        engine.dispose()
+        return {"snapshots": 0, "removed": 0, "applied": apply}
+    now = now or datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    project_ids = resolve_projects(engine, projects) if projects else None
+
+    snapshots = load_snapshots(engine, project_ids)
+    # Snapshots of deleted projects are not on any dashboard: not downsampled, all removed
+    projects_left = existing_projects(engine)
+    orphans = [s for s in snapshots if s.project_id not in projects_left]
+    snapshots = [s for s in snapshots if s.project_id in projects_left]
+    remove = plan_retention(snapshots, now, daily_days, expire_days)
+    print(
+        f"Snapshots: {len(snapshots)}, removing {len(remove)} "
+        f"({format_bytes(sum(s.blob_size for s in remove))} of blobs), keeping {len(snapshots) - len(remove)}"
+    )
+    if orphans:
+        print(
+            f"Snapshots of deleted projects: {len(orphans)} "
+            f"({format_bytes(sum(s.blob_size for s in orphans))} of blobs), removing all"
+        )
+    report = {"snapshots": len(snapshots), "removed": len(remove), "orphans_removed": len(orphans), "applied": apply}
+    if not apply:
+        print("Dry run: pass --apply to remove them")
+        engine.dispose()
+        return report
+
+    before_bytes = storage_bytes(engine)
+    before_latency = query_latency(engine, project_ids, repeats)
+    start = time.perf_counter()
+    delete_snapshots(engine, remove + orphans)
+    if run_vacuum:
+        vacuum(engine, full)
+    elapsed = time.perf_counter() - start
+    after_bytes = storage_bytes(engine)
+    after_latency = query_latency(engine, project_ids, repeats)
+    engine.dispose()
+
+    print(f"Done in {elapsed:.1f}s")
+    print(
+        f"\nStorage: {format_bytes(before_bytes)} -> {format_bytes(after_bytes)} "
+        f"({format_bytes(before_bytes - after_bytes)} reclaimed)"
+    )
+    print(f"\n{'Query':<18}{'before ms':>11}{'after ms':>11}")
+    for name in before_latency:
+        print(f"{name:<18}{before_latency[name] * 1000:>11.1f}{after_latency[name] * 1000:>11.1f}")
+
+    report.update(
+        storage_bytes_before=before_bytes,
+        storage_bytes_after=after_bytes,
+        latency_s_before=before_latency,
+        latency_s_after=after_latency,
+    )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply snapshot retention to the Evidently workspace database")
+    parser.add_argument("--conf-path", default="evidently_config.yaml", help="Evidently config, as for run_evidently.py")
+    parser.add_argument("--apply", action="store_true", help="Remove snapshots and vacuum (default: dry run)")
+    parser.add_argument("--daily-days", type=int, default=DAILY_DAYS, help="Keep one snapshot per day for this many days")
+    parser.add_argument("--expire-days", type=int, default=None, help="Remove all snapshots older than this")
+    parser.add_argument("--project", action="append", default=None, help="Project name or id (repeatable; default: all)")
+    parser.add_argument("--no-vacuum", action="store_true", help="Skip the vacuum after removing snapshots")
+    parser.add_argument("--full", action="store_true", help="PostgreSQL VACUUM FULL: return space to the OS, locks tables")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per query when timing latency")
+    parser.add_argument("--json", default=None, help="Write the report to this JSON file")
+    args = parser.parse_args()
+    if args.expire_days is not None and args.expire_days <= args.daily_days:
+        parser.error("--expire-days must be greater than --daily-days")
+
+    report = maintain(
+        args.conf_path,
+        apply=args.apply,
+        daily_days=args.daily_days,
+        expire_days=args.expire_days,
+        projects=args.project,
+        run_vacuum=not args.no_vacuum,
+        full=args.full,
+        repeats=args.repeats,
+    )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,20 @@
 
 Uses the Evidently 0.7.x API (Report, Dataset, DataDefinition, presets)
 and uploads snapshots via RemoteWorkspace with x-api-key auth.
+
+Reports are computed over a process pool and uploaded over a thread pool
+with retries, so long histories (--weeks) backfill quickly. Only a bounded
+number of snapshots is in flight at once.
 """
 
 import argparse
 import datetime
 import json
 import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, List, NamedTuple, Optional, Union
 
 import numpy as np
 import pandas as pd
@@ -35,7 +43,41 @@ from evidently.presets import (
     ClassificationPreset,
     RegressionPreset,
 )
+from evidently.core.report import Snapshot
 from evidently.ui.workspace import RemoteWorkspace
+import requests
+
+from reference_sample import CACHE_DIR, load_reference
+
+# Upload threads; each upload is one HTTP round trip.
+UPLOAD_WORKERS = 8
+UPLOAD_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 1.0
+
+PRESETS = {
+    "drift": DataDriftPreset,
+    "classification": ClassificationPreset,
+    "regression": RegressionPreset,
+    "summary": DataSummaryPreset,
+}
+
+PROJECTS = {
+    "classification": (
+        "Classification Model Monitoring",
+        "Binary classification model for customer churn. "
+        "Tracks data drift and classification performance over {weeks} weeks.",
+    ),
+    "regression": (
+        "Regression Model Monitoring",
+        "Regression model for house price prediction. "
+        "Tracks prediction quality and feature drift over {weeks} weeks.",
+    ),
+    "summary": (
+        "Data Summary Monitoring",
+        "Tracks data summary stats across incoming batches - "
+        "distributions, missing values, feature stats.",
+    ),
+}
 
 
 def get_auth_token() -> str:
@@ -104,124 +146,254 @@ def generate_regression_data(n_samples=1000, drift=False, seed=42):
     return df
 
 
-def populate(api_url: str):
-    """Populate the Evidently workspace with sample projects and reports."""
-
-    token = get_auth_token()
-    ws = RemoteWorkspace(base_url=api_url, secret=token)
-    print("Connected to Evidently API")
-
-    # ── Project 1: Classification Model Monitoring ──
-    print("\n=== Creating project: Classification Model Monitoring ===")
-    clf_project = ws.create_project(
-        "Classification Model Monitoring",
-        description="Binary classification model for customer churn. "
-        "Tracks data drift and classification performance over 6 weeks.",
-    )
-    clf_project.save()
-    print(f"  Project ID: {clf_project.id}")
-
-    data_def_clf = DataDefinition(
-        numerical_columns=["feature_1", "feature_2", "feature_3", "feature_4", "feature_5"],
-        classification=[BinaryClassification(target="target", prediction_labels="prediction")],
-    )
-
-    ref_clf_df = generate_classification_data(n_samples=1000, drift=False, seed=42)
-    ref_clf = Dataset.from_pandas(ref_clf_df, data_definition=data_def_clf)
-
-    for week in range(6):
-        has_drift = week >= 4
-        cur_df = generate_classification_data(n_samples=500, drift=has_drift, seed=100 + week)
-        cur_clf = Dataset.from_pandas(cur_df, data_definition=data_def_clf)
-        ts = datetime.datetime.now() - datetime.timedelta(weeks=5 - week)
-
-        drift_snap = Report([DataDriftPreset()]).run(reference_data=ref_clf, current_data=cur_clf)
-        drift_snap._timestamp = ts
-        ws.add_run(clf_project.id, drift_snap)
-        print(f"  Week {week+1}: data drift (drift={has_drift})")
-
-        perf_snap = Report([ClassificationPreset()]).run(reference_data=ref_clf, current_data=cur_clf)
-        perf_snap._timestamp = ts
-        ws.add_run(clf_project.id, perf_snap)
-        print(f"  Week {week+1}: classification performance")
-
-    # ── Project 2: Regression Model Monitoring ──
-    print("\n=== Creating project: Regression Model Monitoring ===")
-    reg_project = ws.create_project(
-        "Regression Model Monitoring",
-        description="Regression model for house price prediction. "
-        "Tracks prediction quality and feature drift over 6 weeks.",
-    )
-    reg_project.save()
-    print(f"  Project ID: {reg_project.id}")
-
-    data_def_reg = DataDefinition(
-        numerical_columns=["feature_a", "feature_b", "feature_c"],
-        regression=[Regression(target="target", prediction="prediction")],
-    )
-
-    ref_reg_df = generate_regression_data(n_samples=1000, drift=False, seed=7)
-    ref_reg = Dataset.from_pandas(ref_reg_df, data_definition=data_def_reg)
-
-    for week in range(6):
-        has_drift = week >= 3
-        cur_df = generate_regression_data(n_samples=500, drift=has_drift, seed=200 + week)
-        cur_reg = Dataset.from_pandas(cur_df, data_definition=data_def_reg)
-        ts = datetime.datetime.now() - datetime.timedelta(weeks=5 - week)
-
-        drift_snap = Report([DataDriftPreset()]).run(reference_data=ref_reg, current_data=cur_reg)
-        drift_snap._timestamp = ts
-        ws.add_run(reg_project.id, drift_snap)
-        print(f"  Week {week+1}: data drift (drift={has_drift})")
-
-        reg_snap = Report([RegressionPreset()]).run(reference_data=ref_reg, current_data=cur_reg)
-        reg_snap._timestamp = ts
-        ws.add_run(reg_project.id, reg_snap)
-        print(f"  Week {week+1}: regression performance")
-
-    # ── Project 3: Data Summary Monitoring ──
-    print("\n=== Creating project: Data Summary Monitoring ===")
-    dq_project = ws.create_project(
-        "Data Summary Monitoring",
-        description="Tracks data summary stats across incoming batches - "
-        "distributions, missing values, feature stats.",
-    )
-    dq_project.save()
-    print(f"  Project ID: {dq_project.id}")
-
-    data_def_dq = DataDefinition(
+def data_definition(project: str) -> DataDefinition:
+    """DataDefinition of each sample project's datasets."""
+    if project == "classification":
+        return DataDefinition(
+            numerical_columns=["feature_1", "feature_2", "feature_3", "feature_4", "feature_5"],
+            classification=[BinaryClassification(target="target", prediction_labels="prediction")],
+        )
+    if project == "regression":
+        return DataDefinition(
+            numerical_columns=["feature_a", "feature_b", "feature_c"],
+            regression=[Regression(target="target", prediction="prediction")],
+        )
+    return DataDefinition(
         numerical_columns=["age", "income", "score"],
         categorical_columns=["category"],
     )
 
-    for week in range(4):
-        rng = np.random.RandomState(300 + week)
-        n = 500
-        data = pd.DataFrame(
-            {
-                "age": rng.normal(35, 10, n).clip(18, 80).astype(int),
-                "income": rng.lognormal(10.5, 0.8, n),
-                "category": rng.choice(["A", "B", "C", "D"], n),
-                "score": rng.uniform(0, 100, n),
-            }
-        )
 
-        if week >= 2:
-            null_mask = rng.random(n) < 0.15
-            data.loc[null_mask, "age"] = np.nan
-            data.loc[null_mask, "income"] = np.nan
+def generate_summary_data(n_samples=500, nulls=False, seed=300):
+    """Generate a batch of mixed-type data, optionally with missing values."""
+    rng = np.random.RandomState(seed)
+    data = pd.DataFrame(
+        {
+            "age": rng.normal(35, 10, n_samples).clip(18, 80).astype(int),
+            "income": rng.lognormal(10.5, 0.8, n_samples),
+            "category": rng.choice(["A", "B", "C", "D"], n_samples),
+            "score": rng.uniform(0, 100, n_samples),
+        }
+    )
 
-        ref_ds = Dataset.from_pandas(data.head(250), data_definition=data_def_dq)
-        cur_ds = Dataset.from_pandas(data.tail(250), data_definition=data_def_dq)
+    if nulls:
+        null_mask = rng.random(n_samples) < 0.15
+        data.loc[null_mask, "age"] = np.nan
+        data.loc[null_mask, "income"] = np.nan
+
+    return data
+
+
+class ReportJob(NamedTuple):
+    """One snapshot to compute and upload."""
+
+    project: str
+    preset: str
+    week: int
+    drift: bool
+    timestamp: datetime.datetime
+    message: str
+    reference_rows: int = 1000
+    sample_rows: Optional[int] = None
+    cache_dir: str = CACHE_DIR
+
+
+def report_jobs(weeks: int = 6, summary_weeks: int = 4, **reference) -> List[ReportJob]:
+    """
+    All snapshots of the sample projects, one week apart up to now.
+    `reference` sets the reference fields of the classification and
+    regression jobs (reference_rows, sample_rows, cache_dir).
+    """
+    now = datetime.datetime.now()
+    jobs = []
+    # project -> weeks from the end that drift
+    for project, drift_weeks in (("classification", 2), ("regression", 3)):
+        for week in range(weeks):
+            ts = now - datetime.timedelta(weeks=weeks - 1 - week)
+            has_drift = week >= weeks - drift_weeks
+            for preset, message in (
+                ("drift", f"data drift (drift={has_drift})"),
+                (project, f"{project} performance"),
+            ):
+                jobs.append(ReportJob(project, preset, week, has_drift, ts, message, **reference))
+    for week in range(summary_weeks):
+        ts = now - datetime.timedelta(weeks=summary_weeks - 1 - week)
+        has_nulls = week >= summary_weeks // 2
+        message = f"data summary (nulls={'yes' if has_nulls else 'no'})"
+        jobs.append(ReportJob("summary", "summary", week, has_nulls, ts, message))
+    return jobs
+
+
+def job_datasets(job: ReportJob):
+    """
+    Reference and current datasets of a job. The classification and
+    regression references are shared by every week, so they are only
+    generated once per process (and sampled, with job.sample_rows).
+    """
+    data_def = data_definition(job.project)
+    if job.project == "classification":
+        reference = load_reference(
+            f"generate_classification_data(n_samples={job.reference_rows}, drift=False, seed=42)",
+            data_def,
+            lambda: generate_classification_data(
+                n_samples=job.reference_rows, drift=False, seed=42
+            ),
+            max_rows=job.sample_rows,
+            cache_dir=job.cache_dir,
+        )
+        cur_df = generate_classification_data(n_samples=500, drift=job.drift, seed=100 + job.week)
+    elif job.project == "regression":
+        reference = load_reference(
+            f"generate_regression_data(n_samples={job.reference_rows}, drift=False, seed=7)",
+            data_def,
+            lambda: generate_regression_data(n_samples=job.reference_rows, drift=False, seed=7),
+            max_rows=job.sample_rows,
+            cache_dir=job.cache_dir,
+        )
+        cur_df = generate_regression_data(n_samples=500, drift=job.drift, seed=200 + job.week)
+    else:
+        # A new reference every week: nothing to reuse
+        data = generate_summary_data(n_samples=500, nulls=job.drift, seed=300 + job.week)
+        reference = Dataset.from_pandas(data.head(250), data_definition=data_def)
+        cur_df = data.tail(250)
+    return reference, Dataset.from_pandas(cur_df, data_definition=data_def)
+
+
+def compute_snapshot(job: ReportJob) -> dict:
+    """Run a job's report. Runs in a worker process, so returns a plain dict."""
+    reference, current = job_datasets(job)
+    snapshot = Report([PRESETS[job.preset]()]).run(reference_data=reference, current_data=current)
+    snapshot._timestamp = job.timestamp
+    return snapshot.dump_dict()
+
+
+def is_retryable(error: Exception) -> bool:
+    """Connection problems, throttling and server errors are worth retrying."""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+def upload_snapshot(
+    ws: RemoteWorkspace, project_id, snapshot: Union[Snapshot, dict], retries: int = UPLOAD_RETRIES
+):
+    """Upload a snapshot, retrying transient failures with exponential backoff."""
+    if isinstance(snapshot, dict):
+        snapshot = Snapshot.load_dict(snapshot)
+    for attempt in range(retries + 1):
+        try:
+            return ws.add_run(project_id, snapshot)
+        except requests.RequestException as e:
+            if attempt == retries or not is_retryable(e):
+                raise
+            time.sleep(RETRY_BACKOFF_SECONDS * 2**attempt)
+
+
+class Progress:
+    """Thread-safe progress and throughput printer."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.computed = 0
+        self.uploaded = 0
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def report_done(self):
+        with self.lock:
+            self.computed += 1
+
+    def upload_done(self, job: ReportJob):
+        with self.lock:
+            self.uploaded += 1
+            rate = self.uploaded / (time.perf_counter() - self.start)
+            print(
+                f"  [{self.uploaded}/{self.total}] {PROJECTS[job.project][0]}, "
+                f"week {job.week + 1}: {job.message} "
+                f"({self.computed} computed, {rate:.1f} snapshots/s)"
+            )
+
+
+def create_projects(ws: RemoteWorkspace, weeks: int) -> Dict[str, str]:
+    """Create the sample projects; returns project IDs by key."""
+    project_ids = {}
+    for key, (name, description) in PROJECTS.items():
+        print(f"\n=== Creating project: {name} ===")
+        project = ws.create_project(name, description=description.format(weeks=weeks))
+        project.save()
+        print(f"  Project ID: {project.id}")
+        project_ids[key] = project.id
+    return project_ids
+
+
+def populate(
+    api_url: str,
+    weeks: int = 6,
+    summary_weeks: int = 4,
+    report_workers: Optional[int] = None,
+    upload_workers: int = UPLOAD_WORKERS,
+    retries: int = UPLOAD_RETRIES,
+    reference_rows: int = 1000,
+    sample_rows: Optional[int] = None,
+    cache_dir: str = CACHE_DIR,
+):
+    """Populate the Evidently workspace with sample projects and reports."""
 
-        ts = datetime.datetime.now() - datetime.timedelta(weeks=3 - week)
-        dq_snap = Report([DataSummaryPreset()]).run(reference_data=ref_ds, current_data=cur_ds)
-        dq_snap._timestamp = ts
-        ws.add_run(dq_project.id, dq_snap)
-        print(f"  Week {week+1}: data summary (nulls={'yes' if week >= 2 else 'no'})")
+    token = get_auth_token()
+    ws = RemoteWorkspace(base_url=api_url, secret=token)
+    print("Connected to Evidently API")
 
+    project_ids = create_projects(ws, weeks)
+    jobs = report_jobs(
+        weeks,
+        summary_weeks,
+        reference_rows=reference_rows,
+        sample_rows=sample_rows,
+        cache_dir=cache_dir,
+    )
+    progress = Progress(len(jobs))
+    print(f"\n=== Computing and uploading {len(jobs)} reports ===")
+
+    # Snapshots being computed, waiting for upload or uploading. Jobs are
+    # submitted as earlier ones finish, so memory is bounded by this window
+    # rather than by the length of the history.
+    report_workers = report_workers or os.cpu_count() or 1
+    max_in_flight = report_workers + 2 * upload_workers
+    remaining = iter(jobs)
+    pending_reports, pending_uploads = {}, {}
+
+    with ProcessPoolExecutor(max_workers=report_workers) as report_pool, ThreadPoolExecutor(
+        max_workers=upload_workers
+    ) as upload_pool:
+
+        def submit_reports():
+            while len(pending_reports) + len(pending_uploads) < max_in_flight:
+                job = next(remaining, None)
+                if job is None:
+                    return
+                pending_reports[report_pool.submit(compute_snapshot, job)] = job
+
+        submit_reports()
+        while pending_reports or pending_uploads:
+            done, _ = wait([*pending_reports, *pending_uploads], return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in pending_uploads:
+                    future.result()
+                    progress.upload_done(pending_uploads.pop(future))
+                    continue
+                job = pending_reports.pop(future)
+                progress.report_done()
+                snapshot = future.result()
+                upload = upload_pool.submit(
+                    upload_snapshot, ws, project_ids[job.project], snapshot, retries
+                )
+                pending_uploads[upload] = job
+            submit_reports()
+
+    elapsed = time.perf_counter() - progress.start
     print("\n" + "=" * 60)
-    print("Done! 3 projects created with 28 total reports.")
+    print(f"Done! {len(project_ids)} projects created with {len(jobs)} total reports.")
+    print(f"{len(jobs)} snapshots in {elapsed:.1f}s ({len(jobs) / elapsed:.1f} snapshots/s)")
     print("=" * 60)
 
 
@@ -230,9 +402,46 @@ def main():
         description="Populate Evidently dashboard with sample data"
     )
     parser.add_argument("--url", required=True, help="Evidently API URL")
+    parser.add_argument(
+        "--weeks", type=int, default=6, help="Weeks of classification/regression history"
+    )
+    parser.add_argument(
+        "--summary-weeks", type=int, default=4, help="Weeks of data summary history"
+    )
+    parser.add_argument(
+        "--report-workers", type=int, default=None, help="Report processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--upload-workers", type=int, default=UPLOAD_WORKERS, help="Concurrent uploads"
+    )
+    parser.add_argument(
+        "--retries", type=int, default=UPLOAD_RETRIES, help="Retries per failed upload"
+    )
+    parser.add_argument(
+        "--reference-rows", type=int, default=1000, help="Rows in the model reference datasets"
+    )
+    parser.add_argument(
+        "--reference-sample-rows",
+        type=int,
+        default=None,
+        help="Sample larger references down to this many rows (default: use them whole)",
+    )
+    parser.add_argument(
+        "--reference-cache", default=CACHE_DIR, help="Directory of cached reference samples"
+    )
     args = parser.parse_args()
 
-    populate(args.url)
+    populate(
+        args.url,
+        weeks=args.weeks,
+        summary_weeks=args.summary_weeks,
+        report_workers=args.report_workers,
+        upload_workers=args.upload_workers,
+        retries=args.retries,
+        reference_rows=args.reference_rows,
+        sample_rows=args.reference_sample_rows,
+        cache_dir=args.reference_cache,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,96 @@
+"""Shared, optionally sampled reference datasets for Evidently reports.
+
+load_reference() builds a reference Dataset once per process and hands the
+same object to every report. The reference is generated or read once, and so
+are the per-column stats Evidently collects when it wraps the DataFrame.
+
+Reference-side metric statistics are not reused. Each Report run recomputes
+them (distributions, bins, quality metrics) from the reference rows, so
+report time still grows with the size of the reference. Persisting those
+statistics across reports is out of scope, as Evidently's metrics take no
+precomputed input.
+
+Sampling is opt-in. With `max_rows`, a reference larger than that is replaced
+by a seeded sample (stratified by the classification target, if any), which
+bounds the reference-side work. The sample is persisted as Parquet and reused
+across runs. It is an approximation: drift and performance results are
+computed against the sample, not the full reference. Without `max_rows` the
+reference is used as is and nothing is written to disk.
+
+The cache key covers the data source, the DataDefinition, the sample size and
+the seed. `source` must therefore identify the data, e.g. the generator, its
+arguments and seed, or a file with its size and mtime.
+"""
+
+import hashlib
+import os
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+from evidently import DataDefinition, Dataset
+
+CACHE_DIR = os.environ.get(
+    "EVIDENTLY_REFERENCE_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "evidently-reference"),
+)
+
+# Per-process cache of loaded references, by sample key
+_datasets: Dict[str, Dataset] = {}
+
+
+def sample_key(source: str, data_definition: DataDefinition, max_rows: Optional[int] = None, seed: int = 0) -> str:
+    """Cache key of a reference: its source, DataDefinition, sample size and seed."""
+    digest = hashlib.sha256(f"{source}\n{data_definition.json()}\n{max_rows}\n{seed}".encode("utf8"))
+    return digest.hexdigest()[:32]
+
+
+def sample_reference(
+    reference_df: pd.DataFrame, data_definition: DataDefinition, max_rows: int, seed: int = 0
+) -> pd.DataFrame:
+    """Sample at most `max_rows` reference rows, keeping class proportions."""
+    if len(reference_df) <= max_rows:
+        return reference_df.reset_index(drop=True)
+    fraction = max_rows / len(reference_df)
+    classification = data_definition.classification
+    if classification:
+        target = classification[0].target
+        sample = reference_df.groupby(target, group_keys=False).sample(frac=fraction, random_state=seed)
+    else:
+        sample = reference_df.sample(n=max_rows, random_state=seed)
+    # Keep the reference row order
+    return sample.sort_index().reset_index(drop=True)
+
+
+def load_reference(
+    source: str,
+    data_definition: DataDefinition,
+    make_reference: Callable[[], pd.DataFrame],
+    max_rows: Optional[int] = None,
+    seed: int = 0,
+    cache_dir: str = CACHE_DIR,
+) -> Dataset:
+    """
+    Reference Dataset for `source`, sampled to `max_rows` rows if given.
+    `make_reference` is only called when the reference is not cached yet.
+    """
+    key = sample_key(source, data_definition, max_rows, seed)
+    if key in _datasets:
+        return _datasets[key]
+
+    if max_rows is None:
+        reference_df = make_reference()
+    else:
+        path = os.path.join(cache_dir, f"{key}.parquet")
+        if os.path.exists(path):
+            reference_df = pd.read_parquet(path)
+        else:
+            reference_df = sample_reference(make_reference(), data_definition, max_rows, seed)
+            os.makedirs(cache_dir, exist_ok=True)
+            # Write then rename, so concurrent workers never read a partial file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            reference_df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+
+    dataset = Dataset.from_pandas(reference_df, data_definition=data_definition)
+    _datasets[key] = dataset
+    return dataset
@@ -4,13 +4,143 @@
 The `evidently ui` CLI doesn't auto-import the SQL storage components,
 so the `database` config section is unrecognized. This wrapper imports
 the SQL module first, then starts the service using the same code path.
+
+It also adds what `evidently ui` lacks for serving many users:
+
+- `--workers N` runs N uvicorn worker processes behind one socket, so a
+  slow dashboard query only holds up its own worker. The supervisor
+  replaces workers that die. On SIGHUP it restarts them one at a time, and
+  each replacement must be ready before the old worker is stopped.
+  SIGTTIN and SIGTTOU add or remove a worker.
+- The `database` section accepts SQLAlchemy pool settings and
+  per-connection settings: a statement timeout for PostgreSQL, and the
+  journal mode and busy timeout for SQLite (see PooledDatabaseComponent).
+  generate_config.py sizes them from the worker count and CPUs. The
+  `--pool-*` flags override the pool size, overflow and recycle time.
 """
 
+import json
+import os
+from typing import Any, Dict, List, Optional
+
 # Import SQL components BEFORE loading config - this registers
 # the `database` section in SECTION_COMPONENT_TYPE_MAPPING
 import evidently.ui.service.storage.sql.components  # noqa: F401
 
-from evidently.ui.service.app import get_config, run
+# Registers the `cached_fsspec` dataset storage
+import dataset_cache  # noqa: F401
+
+import uvicorn
+from evidently.legacy.utils.numpy_encoder import numpy_dumps
+from evidently.ui.service.app import create_app, get_config
+from evidently.ui.service.storage.sql.components import DatabaseComponent, SQLStorageComponent
+from evidently.ui.service.storage.sql.utils import create_engine_and_migrate
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.engine import make_url
+
+# Worker processes read their options from here, as they only get an import string
+OPTIONS_ENV = "EVIDENTLY_RUN_OPTIONS"
+
+POOL_OPTIONS = ("pool_size", "max_overflow", "pool_recycle", "pool_timeout", "pool_pre_ping")
+
+SQLITE_JOURNAL_MODES = ("delete", "truncate", "persist", "memory", "wal", "off")
+
+
+class PooledDatabaseComponent(DatabaseComponent):
+    """
+    `database` section with SQLAlchemy pool and per-connection settings.
+    Unset settings keep SQLAlchemy's and the database's defaults (5
+    connections, 10 overflow, no recycling or pre-ping, no timeouts).
+    Subclassing registers it for the section in place of DatabaseComponent.
+    """
+
+    pool_size: Optional[int] = None
+    max_overflow: Optional[int] = None
+    # Seconds after which a connection is replaced, e.g. before the server drops idle ones
+    pool_recycle: Optional[int] = None
+    # Seconds a request waits for a free connection before failing
+    pool_timeout: Optional[int] = None
+    # Test connections on checkout, so a restarted database costs no failed requests
+    pool_pre_ping: Optional[bool] = None
+    # PostgreSQL: cancel statements running longer than this (ms)
+    statement_timeout: Optional[int] = None
+    # SQLite: journal mode ("wal" lets readers run alongside the writer)
+    sqlite_journal_mode: Optional[str] = None
+    # SQLite: wait this long for a lock before raising "database is locked" (ms)
+    sqlite_busy_timeout: Optional[int] = None
+
+    def engine_options(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in POOL_OPTIONS if getattr(self, name) is not None}
+
+    def connection_statements(self) -> List[str]:
+        """Statements run on every new connection."""
+        backend = make_url(self.url).get_backend_name()
+        postgres_only = {"statement_timeout": self.statement_timeout}
+        sqlite_only = {"sqlite_journal_mode": self.sqlite_journal_mode, "sqlite_busy_timeout": self.sqlite_busy_timeout}
+        wrong_backend = sqlite_only if backend == "postgresql" else postgres_only if backend == "sqlite" else {}
+        unsupported = [name for name, value in wrong_backend.items() if value is not None]
+        if unsupported:
+            raise ValueError(f"{', '.join(unsupported)} not supported for {backend}")
+
+        statements = []
+        if self.statement_timeout is not None:
+            statements.append(f"SET statement_timeout = {int(self.statement_timeout)}")
+        if self.sqlite_journal_mode is not None:
+            if self.sqlite_journal_mode.lower() not in SQLITE_JOURNAL_MODES:
+                raise ValueError(f"Unknown SQLite journal mode {self.sqlite_journal_mode!r}")
+            statements.append(f"PRAGMA journal_mode = {self.sqlite_journal_mode}")
+        if self.sqlite_busy_timeout is not None:
+            statements.append(f"PRAGMA busy_timeout = {int(self.sqlite_busy_timeout)}")
+        return statements
+
+    def get_engine(self) -> Engine:
+        options = self.engine_options()
+        per_connection = any(
+            value is not None
+            for value in (self.statement_timeout, self.sqlite_journal_mode, self.sqlite_busy_timeout)
+        )
+        if not options and not per_connection:
+            return super().get_engine()
+        if self.url is None:
+            raise ValueError("Pool and connection settings require `database.url`")
+        statements = self.connection_statements()
+        engine = create_engine(self.url, json_serializer=numpy_dumps, **options)
+
+        if statements:
+
+            @event.listens_for(engine, "connect")
+            def configure_connection(dbapi_connection, _):
+                cursor = dbapi_connection.cursor()
+                for statement in statements:
+                    cursor.execute(statement)
+                cursor.close()
+                # Keep the settings if the connection's first transaction rolls back
+                dbapi_connection.commit()
+
+        return engine
+
+
+def load_config(
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    workspace: str = "workspace",
+    conf_path: Optional[str] = None,
+    **pool: Optional[int],
+):
+    """Evidently config, with any non-None pool settings applied to `database`."""
+    config = get_config(host=host, port=port, workspace=workspace, conf_path=conf_path)
+    database = config.additional_components.get("database")
+    overrides = {name: value for name, value in pool.items() if value is not None}
+    if overrides and database is None:
+        raise ValueError("Pool settings require a `database` config section")
+    for name, value in overrides.items():
+        setattr(database, name, value)
+    return config
+
+
+def app_factory():
+    """Build the app in a worker process, from the options main() exported."""
+    return create_app(load_config(**json.loads(os.environ[OPTIONS_ENV])))
 
 
 def main():
@@ -21,15 +151,61 @@ def main():
     parser.add_argument("--port", type=int, default=8000)
     parser.add_argument("--workspace", default="workspace")
     parser.add_argument("--conf-path", default=None)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("WEB_CONCURRENCY", 1)),
+        help="Worker processes (default: $WEB_CONCURRENCY or 1)",
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=30,
+        help="Seconds a stopping worker gets to finish in-flight requests",
+    )
+    parser.add_argument(
+        "--worker-timeout",
+        type=int,
+        default=60,
+        help="Seconds a worker may take to start or answer a healthcheck before it is replaced",
+    )
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=None,
+        help="Restart a worker after this many requests (bounds memory growth)",
+    )
+    parser.add_argument("--pool-size", type=int, default=None, help="Connections kept open per worker")
+    parser.add_argument("--max-overflow", type=int, default=None, help="Extra connections per worker under load")
+    parser.add_argument("--pool-recycle", type=int, default=None, help="Replace connections older than this (s)")
     args = parser.parse_args()
 
-    config = get_config(
+    options = dict(
         host=args.host,
         port=args.port,
         workspace=args.workspace,
         conf_path=args.conf_path,
+        pool_size=args.pool_size,
+        max_overflow=args.max_overflow,
+        pool_recycle=args.pool_recycle,
+    )
+    config = load_config(**options)
+    if args.workers > 1 and isinstance(config.storage, SQLStorageComponent):
+        # Migrate once here, rather than racing migrations in every worker
+        create_engine_and_migrate(config.additional_components["database"].get_engine()).dispose()
+
+    os.environ[OPTIONS_ENV] = json.dumps(options)
+    uvicorn.run(
+        "run_evidently:app_factory",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        # Importing evidently alone can exceed uvicorn's 5s default
+        timeout_worker_healthcheck=args.worker_timeout,
+        limit_max_requests=args.max_requests,
     )
-    run(config)
 
 
 if __name__ == "__main__":
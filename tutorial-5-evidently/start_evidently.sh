@@ -9,10 +9,17 @@ echo "Starting Evidently AI"
 echo "============================================================"
 
 CONFIG_PATH="evidently_config.yaml"
+WORKERS="${EVIDENTLY_WORKERS:-1}"
+
+# Optional SQLAlchemy pool overrides, per worker
+POOL_ARGS=()
+[ -n "$EVIDENTLY_POOL_SIZE" ] && POOL_ARGS+=(--pool-size "$EVIDENTLY_POOL_SIZE")
+[ -n "$EVIDENTLY_MAX_OVERFLOW" ] && POOL_ARGS+=(--max-overflow "$EVIDENTLY_MAX_OVERFLOW")
+[ -n "$EVIDENTLY_POOL_RECYCLE" ] && POOL_ARGS+=(--pool-recycle "$EVIDENTLY_POOL_RECYCLE")
 
 # Generate Evidently config from Metaflow credentials
 echo "Reading Metaflow configuration..."
-python generate_config.py --output "$CONFIG_PATH"
+python generate_config.py --output "$CONFIG_PATH" --workers "$WORKERS"
 
 # Verify config was generated
 if [ ! -f "$CONFIG_PATH" ]; then
@@ -20,15 +27,25 @@ if [ ! -f "$CONFIG_PATH" ]; then
     exit 1
 fi
 
+# Optional snapshot retention before the workers start (see maintain_workspace.py)
+if [ "$EVIDENTLY_APPLY_RETENTION" = "1" ]; then
+    echo "Applying snapshot retention..."
+    python maintain_workspace.py --conf-path "$CONFIG_PATH" --apply || echo "WARNING: snapshot retention failed" >&2
+fi
+
 echo ""
 echo "Host: 0.0.0.0"
 echo "Port: 8000"
+echo "Workers: $WORKERS"
 echo "Config: $CONFIG_PATH"
 echo "============================================================"
 echo ""
 
-# Start Evidently UI service via wrapper (imports SQL components first)
-python run_evidently.py \
+# Start Evidently UI service via wrapper (imports SQL components first).
+# exec so SIGHUP (rolling worker restart) and SIGTERM reach the supervisor.
+exec python run_evidently.py \
     --host 0.0.0.0 \
     --port 8000 \
-    --conf-path "$CONFIG_PATH"
+    --workers "$WORKERS" \
+    --conf-path "$CONFIG_PATH" \
+    "${POOL_ARGS[@]}"
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Chunked synthetic datasets for load testing Evidently.
+
+The generators yield float32 Arrow record batches, so datasets of tens of
+millions of rows can be written to disk with memory bounded by one batch.
+They produce the same columns and apply the same drift as
+`generate_classification_data` / `generate_regression_data` in
+populate_data.py. The classification features follow sklearn's
+`make_classification` model (Gaussian clusters on hypercube vertices, a
+redundant linear combination, a noise feature), with the model parameters
+drawn once per seed so every batch comes from the same distribution.
+
+Write a reference and a drifted current dataset:
+
+    python synthetic_data.py --task classification --reference-rows 50000000 \\
+        --current-rows 5000000 --drift --out data/
+"""
+
+import argparse
+import itertools
+import os
+import time
+from typing import Iterator
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+BATCH_ROWS = 1_000_000
+
+CLASSIFICATION_FEATURES = ["feature_1", "feature_2", "feature_3", "feature_4", "feature_5"]
+
+
+def classification_batches(
+    n_samples: int, drift: bool = False, seed: int = 42, batch_rows: int = BATCH_ROWS
+) -> Iterator[pa.RecordBatch]:
+    """Batches with 5 float32 features, an int8 target and an int8 prediction."""
+    rng = np.random.default_rng(seed)
+    n_informative, n_clusters = 3, 4  # 2 classes x 2 clusters per class
+    # Cluster centroids on hypercube vertices, as make_classification does
+    vertices = np.array(list(itertools.product([-1.0, 1.0], repeat=n_informative)))
+    centroids = vertices[rng.choice(len(vertices), n_clusters, replace=False)].astype(np.float32)
+    covariances = rng.uniform(-1, 1, (n_clusters, n_informative, n_informative)).astype(np.float32)
+    redundant = rng.uniform(-1, 1, (n_informative, 1)).astype(np.float32)
+    column_order = rng.permutation(len(CLASSIFICATION_FEATURES))
+
+    for start in range(0, n_samples, batch_rows):
+        size = min(batch_rows, n_samples - start)
+        cluster = rng.integers(0, n_clusters, size)
+        informative = np.einsum(
+            "ni,nij->nj", rng.standard_normal((size, n_informative), dtype=np.float32), covariances[cluster]
+        )
+        informative += centroids[cluster]
+        features = np.hstack(
+            [informative, informative @ redundant, rng.standard_normal((size, 1), dtype=np.float32)]
+        )[:, column_order]
+        target = (cluster % 2).astype(np.int8)
+        # make_classification flips 1% of labels at random
+        flip = rng.random(size, dtype=np.float32) < 0.01
+        target[flip] = rng.integers(0, 2, int(flip.sum()), dtype=np.int8)
+        noise = rng.normal(0, 0.1, size).astype(np.float32)
+        prediction = (target + noise > 0.5).astype(np.int8)
+
+        if drift:
+            features[:, 0] += rng.normal(2.0, 0.5, size).astype(np.float32)
+            features[:, 1] *= np.float32(1.5)
+            features[:, 2] += rng.uniform(-1, 3, size).astype(np.float32)
+            flip_mask = rng.random(size, dtype=np.float32) < 0.2
+            prediction[flip_mask] = 1 - prediction[flip_mask]
+
+        columns = {name: features[:, i] for i, name in enumerate(CLASSIFICATION_FEATURES)}
+        columns.update(target=target, prediction=prediction)
+        yield pa.RecordBatch.from_pydict(columns)
+
+
+def regression_batches(
+    n_samples: int, drift: bool = False, seed: int = 7, batch_rows: int = BATCH_ROWS
+) -> Iterator[pa.RecordBatch]:
+    """Batches with 3 float32 features, a float32 target and prediction."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_samples, batch_rows):
+        size = min(batch_rows, n_samples - start)
+        x1 = rng.standard_normal(size, dtype=np.float32)
+        x2 = rng.standard_normal(size, dtype=np.float32)
+        x3 = rng.uniform(-2, 2, size).astype(np.float32)
+        target = 3 * x1 + 2 * x2 - x3 + rng.normal(0, 0.5, size).astype(np.float32)
+
+        prediction_noise = rng.normal(0, 2.0 if drift else 0.3, size).astype(np.float32)
+        if drift:
+            x1 += np.float32(1.5)
+            x2 *= np.float32(2)
+
+        yield pa.RecordBatch.from_pydict(
+            {"feature_a": x1, "feature_b": x2, "feature_c": x3, "target": target, "prediction": target + prediction_noise}
+        )
+
+
+GENERATORS = {"classification": classification_batches, "regression": regression_batches}
+
+
+def write_dataset(path: str, batches: Iterator[pa.RecordBatch]) -> int:
+    """Stream batches to a zstd Parquet file; returns the number of rows."""
+    rows = 0
+    writer = None
+    try:
+        for batch in batches:
+            if writer is None:
+                writer = pq.ParquetWriter(path, batch.schema, compression="zstd")
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def positive_int(value: str) -> int:
+    """argparse type for row counts: an empty dataset is not written."""
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"Expected a positive number of rows, got {value}")
+    return number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write large synthetic reference/current datasets")
+    parser.add_argument("--task", choices=list(GENERATORS), default="classification")
+    parser.add_argument("--reference-rows", type=positive_int, default=10_000_000)
+    parser.add_argument("--current-rows", type=positive_int, default=1_000_000)
+    parser.add_argument("--drift", action="store_true", help="Apply drift to the current dataset")
+    parser.add_argument("--seed", type=int, default=None, help="Reference seed (current uses seed + 1)")
+    parser.add_argument("--batch-rows", type=positive_int, default=BATCH_ROWS)
+    parser.add_argument("--out", required=True, help="Output directory")
+    args = parser.parse_args()
+
+    generate = GENERATORS[args.task]
+    seed = args.seed if args.seed is not None else (42 if args.task == "classification" else 7)
+    os.makedirs(args.out, exist_ok=True)
+    for name, rows, drift, dataset_seed in [
+        ("reference", args.reference_rows, False, seed),
+        ("current", args.current_rows, args.drift, seed + 1),
+    ]:
+        path = os.path.join(args.out, f"{name}.parquet")
+        start = time.perf_counter()
+        written = write_dataset(path, generate(rows, drift=drift, seed=dataset_seed, batch_rows=args.batch_rows))
+        elapsed = time.perf_counter() - start
+        size_mb = os.path.getsize(path) / 1024**2
+        print(f"{path}: {written:,} rows, {size_mb:.1f} MB in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
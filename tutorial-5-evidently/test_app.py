@@ -5,17 +5,33 @@ Tests:
 1. Health check via /api/version endpoint
 2. UI accessibility
 3. (Optional) Create a test project and upload a snapshot
+
+With --benchmark, also load-tests the API: snapshot uploads, project and
+snapshot listing and dashboard queries are each sent from concurrent
+workers, and latency percentiles and throughput are reported per endpoint.
+
+To check several deployments (Evidently, MLflow, vLLM, FastAPI) at once,
+use smoke_test.py at the repository root.
 """
 
 import sys
 import json
+import math
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import requests
-from typing import Tuple
+from typing import Callable, Dict, List, Tuple
 
+# Shared by the checks so they reuse one connection to the deployment
+SESSION = requests.Session()
 
+
+@lru_cache(maxsize=None)
 def get_auth_headers() -> dict:
-    """Get authentication headers using Metaflow config."""
+    """Get authentication headers using Metaflow config (read once per process)."""
     try:
         from metaflow.metaflow_config_funcs import init_config
 
@@ -41,7 +57,7 @@ def test_health(url: str, headers: dict = None) -> Tuple[bool, str]:
         health_url = f"{url.rstrip('/')}/api/version"
         print(f"Checking: {health_url}")
 
-        response = requests.get(health_url, headers=headers or {}, timeout=10)
+        response = SESSION.get(health_url, headers=headers or {}, timeout=10)
 
         if response.status_code == 200:
             print(f"Status: {response.status_code}")
@@ -68,7 +84,7 @@ def test_ui(url: str, headers: dict = None) -> Tuple[bool, str]:
     print(f"URL: {url}")
 
     try:
-        response = requests.get(
+        response = SESSION.get(
             url, headers=headers or {}, timeout=10, allow_redirects=False
         )
 
@@ -115,6 +131,142 @@ def test_create_project(url: str, headers: dict = None) -> Tuple[bool, str]:
         return False, f"Error: {e}"
 
 
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    index = max(0, math.ceil(q / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def run_phase(
+    name: str,
+    send: Callable[[requests.Session], requests.Response],
+    n_requests: int,
+    concurrency: int,
+) -> Dict:
+    """Send `n_requests` from `concurrency` threads and summarize latencies."""
+    local = threading.local()
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def one_request(_):
+        # One pooled session per worker thread
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = send(local.session)
+            response.raise_for_status()
+            error = None
+        except requests.RequestException as e:
+            error = str(e)
+        elapsed = time.perf_counter() - start
+        with lock:
+            (errors.append(error) if error else latencies.append(elapsed))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_request, range(n_requests)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    ms = [latency * 1000 for latency in latencies]
+    result = {
+        "endpoint": name,
+        "requests": n_requests,
+        "errors": len(errors),
+        "throughput_rps": len(latencies) / wall,
+        "p50_ms": percentile(ms, 50),
+        "p90_ms": percentile(ms, 90),
+        "p99_ms": percentile(ms, 99),
+        "max_ms": ms[-1] if ms else float("nan"),
+    }
+    if errors:
+        result["first_error"] = errors[0]
+    return result
+
+
+def run_benchmark(
+    url: str,
+    headers: dict,
+    n_requests: int,
+    concurrency: int,
+    keep_project: bool = False,
+) -> List[Dict]:
+    """Load-test the main API endpoints on a scratch project."""
+    print(f"\n{'='*60}")
+    print(f"Benchmark: {n_requests} requests per endpoint, {concurrency} concurrent")
+    print(f"{'='*60}")
+
+    # Imported here so the basic checks only need `requests`
+    from evidently.legacy.utils import NumpyEncoder
+    from populate_data import RemoteWorkspace, compute_snapshot, report_jobs
+
+    api = url.rstrip("/")
+    ws = RemoteWorkspace(base_url=api, secret=headers.get("x-api-key"))
+    project = ws.create_project(
+        f"benchmark-{int(time.time())}",
+        description="Scratch project for test_app.py --benchmark",
+    )
+    project.save()
+    print(f"Scratch project: {project.id}")
+    snapshot_body = json.dumps(compute_snapshot(report_jobs()[0]), cls=NumpyEncoder)
+    json_headers = {**headers, "Content-Type": "application/json"}
+
+    def get(path):
+        return lambda s: s.get(f"{api}{path}", headers=headers, timeout=60)
+
+    def post(path, body):
+        return lambda s: s.post(
+            f"{api}{path}", data=body, headers=json_headers, timeout=60
+        )
+
+    snapshots = f"/api/v2/snapshots/{project.id}"
+    phases = [
+        ("POST /api/v2/snapshots/{id}", post(snapshots, snapshot_body)),
+        ("GET /api/projects", get("/api/projects")),
+        (
+            "GET /api/projects/{id}/snapshots",
+            get(f"/api/projects/{project.id}/snapshots"),
+        ),
+        ("GET /api/v2/dashboards/{id}", get(f"/api/v2/dashboards/{project.id}")),
+        ("GET /api/v2/snapshots/{id}/metrics", get(f"{snapshots}/metrics")),
+    ]
+    results = []
+    try:
+        for name, send in phases:
+            results.append(run_phase(name, send, n_requests, concurrency))
+            print(f"  {name}: done")
+
+        # Dashboard panels query metric series over the uploaded snapshots
+        metrics = requests.get(f"{api}{snapshots}/metrics", headers=headers, timeout=60)
+        series_filter = [
+            {"tags": [], "metadata": {}, "metric": metric, "metric_labels": {}}
+            for metric in metrics.json()["metrics"][:5]
+        ]
+        series_body = json.dumps({"series_filter": series_filter})
+        name = "POST /api/v2/snapshots/{id}/data_series_batch"
+        send = post(f"{snapshots}/data_series_batch", series_body)
+        results.append(run_phase(name, send, n_requests, concurrency))
+        print(f"  {name}: done")
+    finally:
+        if not keep_project:
+            ws.delete_project(project.id)
+
+    print(
+        f"\n{'Endpoint':<48}{'req/s':>8}{'p50 ms':>9}{'p90 ms':>9}"
+        f"{'p99 ms':>9}{'max ms':>9}{'errors':>8}"
+    )
+    for r in results:
+        print(
+            f"{r['endpoint']:<48}{r['throughput_rps']:>8.1f}"
+            f"{r['p50_ms']:>9.1f}{r['p90_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+            f"{r['max_ms']:>9.1f}{r['errors']:>8}"
+        )
+    return results
+
+
 def main():
     import argparse
 
@@ -134,6 +286,9 @@ Examples:
 
   # Test locally
   python test_app.py --url http://localhost:8000
+
+  # Load test: 200 requests per endpoint from 16 concurrent workers
+  python test_app.py --url http://localhost:8000 --benchmark --requests 200 --concurrency 16
         """,
     )
 
@@ -146,6 +301,25 @@ Examples:
         action="store_true",
         help="Test creating a project via the API",
     )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="Load-test the API and report latency percentiles per endpoint",
+    )
+    parser.add_argument(
+        "--requests", type=int, default=100, help="Requests per endpoint in --benchmark"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Concurrent workers in --benchmark"
+    )
+    parser.add_argument(
+        "--benchmark-json", help="Also write --benchmark results to this JSON file"
+    )
+    parser.add_argument(
+        "--keep-project",
+        action="store_true",
+        help="Keep the --benchmark scratch project and its snapshots",
+    )
 
     args = parser.parse_args()
 
@@ -170,6 +344,25 @@ Examples:
         proj_ok, proj_msg = test_create_project(args.url, headers)
         results.append(("Project Creation", proj_ok, proj_msg))
 
+    if args.benchmark:
+        try:
+            bench = run_benchmark(
+                args.url, headers, args.requests, args.concurrency, args.keep_project
+            )
+            if args.benchmark_json:
+                with open(args.benchmark_json, "w") as f:
+                    json.dump(bench, f, indent=2)
+            failed = sum(r["errors"] for r in bench)
+            results.append(
+                (
+                    "Benchmark",
+                    failed == 0,
+                    f"{len(bench)} endpoints, {failed} failed requests",
+                )
+            )
+        except Exception as e:
+            results.append(("Benchmark", False, f"Error: {e}"))
+
     # Print summary
     print(f"\n{'='*60}")
     print("Test Summary")
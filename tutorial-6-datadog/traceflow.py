@@ -1,20 +1,19 @@
+import os
 import time
 from metaflow import FlowSpec, step, environment, pypi_base
-from metaflow.apps import AppDeployer
 
-DATADOG_DEPLOYMENT_NAME = "datadog-agent"
+from deployment_urls import get_deployment_url
 
-# Fetch the URL of the deployed Datadog agent instance
-def get_datadog_agent_url(): 
-    dd_deployments = AppDeployer().list_deployments(name=DATADOG_DEPLOYMENT_NAME)
-    if len(dd_deployments) == 0:
-        raise ValueError(f"No Datadog agent deployment found with name {DATADOG_DEPLOYMENT_NAME}")
-    dd_deployment = dd_deployments[0]
+DATADOG_DEPLOYMENT_NAME = "datadog-agent"
 
-    return dd_deployment.internal_url
+# Fetch the URL of the deployed Datadog agent instance (cached, see deployment_urls.py)
+def get_datadog_agent_url():
+    try:
+        return get_deployment_url(DATADOG_DEPLOYMENT_NAME)
+    except ValueError:
+        raise ValueError(f"No Datadog agent deployment found with name {DATADOG_DEPLOYMENT_NAME}") from None
 
 DD_ENV_VARS = {
-    "DD_TRACE_AGENT_URL": get_datadog_agent_url(),
     "DD_SERVICE": "metaflow",
     "DD_ENV": "dev",
 }
@@ -24,6 +23,10 @@ class DatadogTraceFlow(FlowSpec):
     @environment(vars=DD_ENV_VARS)
     @step
     def start(self):
+        # Resolved here rather than at import time, so only the tasks that
+        # send traces wait for the deployment API
+        os.environ["DD_TRACE_AGENT_URL"] = get_datadog_agent_url()
+
         # Its important to import the traces *AFTER* the environment variables are set
         from ddtrace import tracer
 
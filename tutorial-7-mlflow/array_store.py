@@ -0,0 +1,77 @@
+"""
+Pass large NumPy arrays between steps as .npy files instead of artifacts.
+
+Metaflow pickles and gzips every artifact, and a step that reads one gets it
+back whole: downloaded, decompressed and unpickled into memory. Every foreach
+branch that reads the training set pays that again. save_array() writes an
+array once per run as an uncompressed .npy file, to S3 next to the run's data
+when the datastore is S3, otherwise under the local datastore directory.
+load_array() memory-maps it, so reading the file costs nothing up front, only
+the rows a step touches are paged in, and joblib workers share the mapping
+instead of receiving a pickled copy.
+
+    self.X_path = save_array(self, "X", X, dtype="float32")  # in one step
+    X = load_array(self.X_path)                             # in any later one
+
+Store the returned path as an artifact; it is all a later step needs. From
+S3, each task downloads the file once to CACHE_DIR and maps it from there.
+"""
+
+import os
+import shutil
+import tempfile
+from urllib.parse import urlparse
+
+import numpy as np
+
+ARRAY_PREFIX = "arrays"
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "metaflow-arrays")
+
+
+def save_array(flow, name, array, dtype=None):
+    """Write `array` (cast to `dtype`, if given) for this run; returns its path."""
+    from metaflow import current
+    from metaflow.metaflow_config import DEFAULT_DATASTORE
+
+    array = np.ascontiguousarray(array, dtype=dtype)
+    key = f"{ARRAY_PREFIX}/{name}.npy"
+    if DEFAULT_DATASTORE == "s3":
+        from metaflow import S3
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, f"{name}.npy")
+            np.save(path, array)
+            with S3(run=flow) as s3:
+                return s3.put_files([(key, path)])[0][1]
+
+    from metaflow.plugins.datastores.local_storage import LocalStorage
+
+    root = LocalStorage.get_datastore_root_from_config(print)
+    path = os.path.join(root, current.flow_name, current.run_id, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.save(path, array)
+    return path
+
+
+def load_array(path, mmap=True):
+    """Read an array written by save_array(), memory-mapped unless `mmap` is False."""
+    if path.startswith("s3://"):
+        path = _download(path)
+    return np.load(path, mmap_mode="r" if mmap else None)
+
+
+def _download(url):
+    parsed = urlparse(url)
+    path = os.path.join(CACHE_DIR, parsed.netloc, parsed.path.lstrip("/"))
+    if os.path.exists(path):
+        return path
+
+    from metaflow import S3
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with S3() as s3:
+        # The object is deleted with the S3 client's temp directory
+        shutil.move(s3.get(url).path, tmp_path)
+    os.replace(tmp_path, path)
+    return path
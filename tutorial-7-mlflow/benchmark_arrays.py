@@ -0,0 +1,102 @@
+"""
+Compare passing the training set as a Metaflow artifact with .npy files.
+
+A Metaflow artifact is pickled and gzipped into the datastore, and every
+step that reads it decompresses and unpickles the whole thing. The flow
+instead writes .npy files with array_store.py and memory-maps them. This
+measures, for a dataset shaped like the flow's, the bytes stored and the
+time a step spends before it can use the data: loading it, and loading it
+plus one full pass over it (what fitting a model costs at least).
+
+Artifacts are encoded the way Metaflow's datastore does it (pickle protocol
+4, gzip level 3), from a local disk, so S3 transfer time comes on top of
+both in a real deployment, in proportion to the bytes stored.
+
+Usage:
+    python benchmark_arrays.py
+    python benchmark_arrays.py --rows 20000000 --features 10
+"""
+
+import argparse
+import gzip
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from array_store import load_array
+
+
+def save_artifact(path, array):
+    with open(path, "wb") as f:
+        f.write(gzip.compress(pickle.dumps(array, protocol=4), compresslevel=3))
+
+
+def load_artifact(path):
+    with open(path, "rb") as f:
+        return pickle.loads(gzip.decompress(f.read()))
+
+
+def save_npy(path, array):
+    np.save(path, array)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def drop_page_cache(path):
+    """Evict `path` from the page cache, so loads read from disk (Linux)."""
+    if hasattr(os, "posix_fadvise"):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dataset passing")
+    parser.add_argument("--rows", type=int, default=5_000_000, help="Dataset rows")
+    parser.add_argument("--features", type=int, default=3, help="Dataset columns")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    X = rng.standard_normal((args.rows, args.features))
+    print(f"Dataset: {args.rows:,} x {args.features} ({X.nbytes / 2**20:,.0f} MiB)\n")
+
+    workdir = tempfile.mkdtemp(prefix="array-bench-")
+    try:
+        print(f"{'Format':<18}{'MiB':>8}{'save s':>9}{'load s':>9}{'load+scan s':>13}")
+        for dtype in ("float64", "float32"):
+            data = X.astype(dtype)
+            for fmt, save, load, ext in (
+                ("artifact", save_artifact, load_artifact, "pkl.gz"),
+                ("npy mmap", save_npy, load_array, "npy"),
+            ):
+                path = os.path.join(workdir, f"X-{dtype}.{ext}")
+                _, save_seconds = timed(save, path, data)
+                size = os.path.getsize(path)
+
+                drop_page_cache(path)
+                _, load_seconds = timed(load, path)
+                drop_page_cache(path)
+                start = time.perf_counter()
+                float(load(path).sum())
+                scan_seconds = time.perf_counter() - start
+
+                print(
+                    f"{fmt + ' ' + dtype:<18}{size / 2**20:>8,.0f}{save_seconds:>9.2f}"
+                    f"{load_seconds:>9.3f}{scan_seconds:>13.3f}"
+                )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Compare per-call MLflow logging with BatchLogger.
+
+Simulates a training loop that logs a few metrics every step, once with
+`mlflow.log_metric` per value and once with BatchLogger (mlflow_logging.py).
+It reports how long the loop was held up by logging, how long until every
+value reached the server, and checks that all of them arrived.
+
+Usage:
+    python benchmark_logging.py                       # local mlflow server
+    python benchmark_logging.py --steps 5000 --tracking-uri https://your-mlflow-url
+"""
+
+import argparse
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import mlflow
+import requests
+from mlflow.tracking import MlflowClient
+
+from mlflow_logging import BatchLogger
+
+METRICS = ("loss", "val_loss", "lr")
+
+
+def start_local_server(workdir):
+    """Start `mlflow server` on a free port with a SQLite backend."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "mlflow",
+            "server",
+            "--backend-store-uri",
+            f"sqlite:///{workdir}/mlflow.db",
+            "--default-artifact-root",
+            f"{workdir}/mlartifacts",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            "1",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    uri = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"mlflow server exited with code {server.returncode}")
+        try:
+            if requests.get(f"{uri}/health", timeout=2).ok:
+                return server, uri
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise TimeoutError("mlflow server did not start")
+
+
+def training_loop(steps, log_metric, step_seconds):
+    """Time spent in a loop that logs METRICS every step."""
+    start = time.perf_counter()
+    for step in range(steps):
+        if step_seconds:
+            time.sleep(step_seconds)  # the actual training work
+        for i, key in enumerate(METRICS):
+            log_metric(key, 1.0 / (step + 1) + i, step)
+    return time.perf_counter() - start
+
+
+def run_per_call(steps, step_seconds):
+    with mlflow.start_run(run_name="per-call-logging") as run:
+        loop = training_loop(
+            steps, lambda k, v, s: mlflow.log_metric(k, v, step=s), step_seconds
+        )
+    return run.info.run_id, loop, loop, None
+
+
+def run_batched(steps, step_seconds):
+    with mlflow.start_run(run_name="batched-logging") as run:
+        start = time.perf_counter()
+        with BatchLogger(run.info.run_id) as logger:
+            loop = training_loop(steps, logger.log_metric, step_seconds)
+        total = time.perf_counter() - start
+    return run.info.run_id, loop, total, logger.batches_sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched MLflow logging")
+    parser.add_argument("--steps", type=int, default=1000, help="Training steps")
+    parser.add_argument(
+        "--step-ms", type=float, default=0.0, help="Simulated training time per step"
+    )
+    parser.add_argument(
+        "--tracking-uri",
+        default=None,
+        help="MLflow server (default: start one locally)",
+    )
+    args = parser.parse_args()
+
+    server = workdir = None
+    uri = args.tracking_uri
+    if uri is None:
+        workdir = tempfile.mkdtemp(prefix="mlflow-bench-")
+        server, uri = start_local_server(workdir)
+    try:
+        mlflow.set_tracking_uri(uri)
+        mlflow.set_experiment("logging-benchmark")
+        client = MlflowClient()
+        n_values = args.steps * len(METRICS)
+        print(f"Tracking server: {uri}")
+        print(f"Logging {n_values:,} values over {args.steps:,} steps\n")
+
+        print(
+            f"{'Mode':<12}{'loop s':>9}{'total s':>9}{'values/s':>11}{'requests':>10}"
+        )
+        for mode, run in (("per-call", run_per_call), ("batched", run_batched)):
+            run_id, loop, total, batches = run(args.steps, args.step_ms / 1000)
+            logged = sum(len(client.get_metric_history(run_id, key)) for key in METRICS)
+            if logged != n_values:
+                raise RuntimeError(
+                    f"{mode}: {logged} of {n_values} values reached the server"
+                )
+            print(
+                f"{mode:<12}{loop:>9.2f}{total:>9.2f}{n_values / total:>11,.0f}"
+                f"{batches if batches is not None else n_values:>10,}"
+            )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+../deployment_urls.py
\ No newline at end of file
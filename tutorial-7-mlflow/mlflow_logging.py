@@ -0,0 +1,192 @@
+"""
+Asynchronous, batched logging to an MLflow Tracking Server.
+
+`mlflow.log_param` and `mlflow.log_metric` each make an HTTP request to the
+tracking server, so a training loop that logs every step waits on the
+network for every value. BatchLogger queues params, metrics and tags, and a
+background thread sends them with `MlflowClient.log_batch`: whatever
+accumulated while the previous request was in flight goes out in the next
+one, up to MLflow's per-request limits.
+
+    with mlflow.start_run() as run, BatchLogger(run.info.run_id) as logger:
+        for step in range(n_steps):
+            logger.log_metric("loss", loss, step=step)
+
+The queue is bounded. Logging only blocks if the server falls more than
+`max_queue` values behind, which keeps memory bounded. Leaving the `with`
+block sends everything still queued. If the background thread fails to
+log, the error is raised from the next `flush()` or `close()`.
+"""
+
+import queue
+import threading
+import time
+
+import requests
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.exceptions import RestException
+from mlflow.tracking import MlflowClient
+from mlflow.utils.validation import (
+    MAX_ENTITIES_PER_BATCH,
+    MAX_METRICS_PER_BATCH,
+    MAX_PARAMS_TAGS_PER_BATCH,
+)
+
+MAX_QUEUE = 100_000
+
+# Retries per batch, on top of the HTTP retries the client does itself
+RETRIES = 3
+RETRY_BACKOFF_SECONDS = 0.5
+
+# os.environ key MLflow's telemetry thread sets and unsets; requests can hit a
+# KeyError reading os.environ while it does
+TELEMETRY_ENV_KEY = "_MLFLOW_TELEMETRY_SESSION_ID"
+
+_STOP = object()
+
+
+class BatchLogger:
+    """Logs params, metrics and tags to one run from a background thread."""
+
+    def __init__(self, run_id, client=None, max_queue=MAX_QUEUE, retries=RETRIES):
+        self.run_id = run_id
+        self.client = client or MlflowClient()
+        self.retries = retries
+        self.batches_sent = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._error = None
+        self._thread = threading.Thread(
+            target=self._run, name="mlflow-batch-logger", daemon=True
+        )
+        self._thread.start()
+
+    def log_param(self, key, value):
+        self._queue.put(Param(key, str(value)))
+
+    def log_params(self, params):
+        for key, value in params.items():
+            self.log_param(key, value)
+
+    def log_metric(self, key, value, step=None):
+        # Timestamped now, not when the batch is sent
+        timestamp = int(time.time() * 1000)
+        self._queue.put(Metric(key, float(value), timestamp, step or 0))
+
+    def log_metrics(self, metrics, step=None):
+        for key, value in metrics.items():
+            self.log_metric(key, value, step=step)
+
+    def set_tag(self, key, value):
+        self._queue.put(RunTag(key, str(value)))
+
+    def flush(self):
+        """Wait until everything logged so far has been sent."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """Send everything still queued and stop the background thread."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Don't mask the original error with a logging one
+            try:
+                self.close()
+            except Exception:
+                pass
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError(
+                f"MLflow logging failed for run {self.run_id}"
+            ) from error
+
+    def _run(self):
+        pending = None
+        stopping = False
+        while not stopping:
+            item = pending if pending is not None else self._queue.get()
+            pending = None
+            if item is _STOP:
+                self._queue.task_done()
+                break
+
+            metrics, params, tags = [], {}, {}
+            taken = 0
+            while True:
+                if isinstance(item, Metric):
+                    full = len(metrics) == MAX_METRICS_PER_BATCH
+                elif isinstance(item, Param):
+                    full = len(params) == MAX_PARAMS_TAGS_PER_BATCH
+                else:
+                    full = len(tags) == MAX_PARAMS_TAGS_PER_BATCH
+                if (
+                    full
+                    or len(metrics) + len(params) + len(tags) == MAX_ENTITIES_PER_BATCH
+                ):
+                    pending = item
+                    break
+                taken += 1
+                if isinstance(item, Metric):
+                    metrics.append(item)
+                elif isinstance(item, Param):
+                    # log_batch rejects a key twice in one request
+                    params[item.key] = item
+                else:
+                    tags[item.key] = item
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+
+            self._send(metrics, list(params.values()), list(tags.values()))
+            for _ in range(taken):
+                self._queue.task_done()
+            if stopping:
+                self._queue.task_done()
+
+    def _send(self, metrics, params, tags):
+        if self._error is not None:
+            # Already failed: drop the rest rather than stall the training loop
+            return
+        for attempt in range(self.retries + 1):
+            try:
+                self.client.log_batch(
+                    self.run_id, metrics=metrics, params=params, tags=tags
+                )
+                self.batches_sent += 1
+                return
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    self._error = e
+                    return
+                time.sleep(RETRY_BACKOFF_SECONDS * 2**attempt)
+
+
+def is_retryable(error):
+    """Throttling, server errors, lost connections, timeouts and the telemetry race."""
+    if isinstance(error, RestException):
+        # The server answered
+        status = error.get_http_status_code()
+        return status == 429 or status >= 500
+    if isinstance(error, KeyError):
+        return error.args == (TELEMETRY_ENV_KEY,)
+    # The client wraps failed requests in an MlflowException chained to the cause
+    while error is not None:
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
@@ -4,27 +4,45 @@ deployed MLflow Tracking Server on Outerbounds.
 
 Usage:
     python train_flow.py run
+    python train_flow.py run --sweep --max-workers 8
+    python train_flow.py run --n-samples 5000000 --float32
+
+With --sweep, every alpha/degree combination is trained in its own
+foreach branch and logged as a nested MLflow run; the join step registers
+the model with the lowest cross-validation error. The dataset reaches the
+branches as memory-mapped .npy files (array_store.py), not as artifacts.
 
 Prerequisites:
     Deploy the MLflow server first:
         outerbounds app deploy --config-file config.yaml
 """
 
+import os
+
 from metaflow import FlowSpec, step, pypi_base, Parameter
-from metaflow.apps import AppDeployer
+
+from deployment_urls import get_deployment_url
 
 MLFLOW_DEPLOYMENT_NAME = "mlflow-tracking"
+EXPERIMENT_NAME = "outerbounds-demo"
+REGISTERED_MODEL_NAME = "outerbounds-ridge"
 
 
 def get_mlflow_url():
-    """Resolve the internal URL of the deployed MLflow server."""
-    deployments = AppDeployer().list_deployments(name=MLFLOW_DEPLOYMENT_NAME)
-    if not deployments:
+    """Resolve the internal URL of the deployed MLflow server (cached)."""
+    try:
+        return get_deployment_url(MLFLOW_DEPLOYMENT_NAME)
+    except ValueError as e:
         raise ValueError(
-            f"No deployment found with name '{MLFLOW_DEPLOYMENT_NAME}'. "
-            "Deploy it first: outerbounds app deploy --config-file config.yaml"
-        )
-    return deployments[0].internal_url
+            f"{e}. Deploy it first: outerbounds app deploy --config-file config.yaml"
+        ) from None
+
+
+def available_cpus():
+    """CPUs this task may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
 
 
 @pypi_base(
@@ -43,69 +61,243 @@ class MLflowTrainFlow(FlowSpec):
         help="MLflow tracking URI (auto-detected from deployment if omitted)",
         default="",
     )
+    sweep = Parameter(
+        "sweep",
+        help="Sweep the alpha/degree grid instead of training a single model",
+        is_flag=True,
+        default=False,
+    )
+    alphas = Parameter(
+        "alphas",
+        help="Comma-separated Ridge alphas to sweep",
+        default="0.01,0.1,1,10,100",
+    )
+    degrees = Parameter(
+        "degrees",
+        help="Comma-separated polynomial feature degrees to sweep",
+        default="1,2",
+    )
+    cv_folds = Parameter(
+        "cv-folds",
+        help="Cross-validation folds per model",
+        default=5,
+    )
+    cv_workers = Parameter(
+        "cv-workers",
+        help="Processes that run the folds (default: CPUs available to the task)",
+        default=0,
+    )
+    n_samples = Parameter(
+        "n-samples",
+        help="Rows in the generated dataset",
+        default=200,
+    )
+    float32 = Parameter(
+        "float32",
+        help="Store the dataset as float32, half the size of float64",
+        is_flag=True,
+        default=False,
+    )
 
     @step
     def start(self):
-        """Generate a toy dataset."""
+        """Generate a toy dataset and, for a sweep, start the parent MLflow run."""
+        import mlflow
         import numpy as np
+        from array_store import save_array
+        from sklearn.model_selection import train_test_split
 
         np.random.seed(42)
-        n = 200
-        self.X = np.random.randn(n, 3)
-        self.y = self.X @ np.array([1.5, -2.0, 0.5]) + np.random.randn(n) * 0.3
-        print(f"Generated dataset: {n} samples, {self.X.shape[1]} features")
-        self.next(self.train)
+        n = self.n_samples
+        X = np.random.randn(n, 3)
+        y = X @ np.array([1.5, -2.0, 0.5]) + np.random.randn(n) * 0.3
+        print(f"Generated dataset: {n} samples, {X.shape[1]} features")
+
+        # Same split for every branch, so their test scores are comparable.
+        # Rows are stored test split first, so each split is a slice of the
+        # memory-mapped file rather than a copy.
+        train_idx, test_idx = train_test_split(
+            np.arange(n), test_size=0.2, random_state=42
+        )
+        order = np.concatenate([test_idx, train_idx])
+        self.n_test = len(test_idx)
+
+        # .npy files rather than artifacts, which every branch would unpickle
+        dtype = "float32" if self.float32 else "float64"
+        self.X_path = save_array(self, "X", X[order], dtype=dtype)
+        self.y_path = save_array(self, "y", y[order], dtype=dtype)
+        print(f"Stored dataset as {dtype}: {self.X_path}")
+
+        if self.sweep:
+            self.grid = [
+                {"alpha": float(alpha), "degree": int(degree)}
+                for alpha in self.alphas.split(",")
+                for degree in self.degrees.split(",")
+            ]
+        else:
+            self.grid = [{"alpha": 1.0, "degree": 1}]
+        print(f"Training {len(self.grid)} model(s)")
+
+        # Point MLflow at the deployed tracking server
+        self.mlflow_uri = self.tracking_uri or get_mlflow_url()
+        print(f"MLflow tracking URI: {self.mlflow_uri}")
+        mlflow.set_tracking_uri(self.mlflow_uri)
+        mlflow.set_experiment(EXPERIMENT_NAME)
+
+        self.dataset_params = {"n_samples": n, "n_features": X.shape[1], "dtype": dtype}
+
+        # In a sweep each branch logs a nested run under this one; a single
+        # model is logged as one top-level run
+        self.parent_run_id = None
+        if self.sweep:
+            with mlflow.start_run(run_name="ridge-sweep") as run:
+                mlflow.log_params(
+                    {
+                        **self.dataset_params,
+                        "grid_size": len(self.grid),
+                        "cv_folds": self.cv_folds,
+                    }
+                )
+            self.parent_run_id = run.info.run_id
+
+        self.next(self.train, foreach="grid")
 
     @step
     def train(self):
-        """Train a Ridge regression model and log to MLflow."""
+        """Fit one grid point, cross-validated in a sweep, and log it to MLflow."""
         import mlflow
+        from array_store import load_array
+        from mlflow_logging import BatchLogger
         from sklearn.linear_model import Ridge
-        from sklearn.model_selection import train_test_split
         from sklearn.metrics import mean_squared_error, r2_score
+        from sklearn.model_selection import KFold, cross_validate
+        from sklearn.pipeline import make_pipeline
+        from sklearn.preprocessing import PolynomialFeatures
 
-        # Point MLflow at the deployed tracking server
-        uri = self.tracking_uri or get_mlflow_url()
-        print(f"MLflow tracking URI: {uri}")
-        mlflow.set_tracking_uri(uri)
-        mlflow.set_experiment("outerbounds-demo")
-
-        # Split
-        X_train, X_test, y_train, y_test = train_test_split(
-            self.X, self.y, test_size=0.2, random_state=42
-        )
+        self.params = self.input
+        alpha, degree = self.params["alpha"], self.params["degree"]
+        mlflow.set_tracking_uri(self.mlflow_uri)
+        mlflow.set_experiment(EXPERIMENT_NAME)
 
-        alpha = 1.0
+        X, y = load_array(self.X_path), load_array(self.y_path)
+        X_train, X_test = X[self.n_test :], X[: self.n_test]
+        y_train, y_test = y[self.n_test :], y[: self.n_test]
 
-        with mlflow.start_run(run_name="ridge-regression"):
-            # Train
-            model = Ridge(alpha=alpha)
-            model.fit(X_train, y_train)
+        # Degree 1 is a plain Ridge model, without a pipeline around it
+        model = Ridge(alpha=alpha)
+        if degree > 1:
+            model = make_pipeline(PolynomialFeatures(degree, include_bias=False), model)
 
-            # Evaluate
-            preds = model.predict(X_test)
-            mse = mean_squared_error(y_test, preds)
-            r2 = r2_score(y_test, preds)
-
-            # Log params + metrics
-            mlflow.log_param("alpha", alpha)
-            mlflow.log_param("n_samples", len(self.X))
-            mlflow.log_param("n_features", self.X.shape[1])
-            mlflow.log_metric("mse", mse)
-            mlflow.log_metric("r2", r2)
-
-            # Register the model
-            mlflow.sklearn.log_model(
+        # Cross-validation only serves to pick the best grid point
+        params = {"alpha": alpha}
+        fold_mse, self.cv_mse = [], None
+        if self.sweep:
+            # joblib runs the folds in a pool of worker processes
+            workers = min(self.cv_workers or available_cpus(), self.cv_folds)
+            cv = cross_validate(
                 model,
-                artifact_path="ridge-model",
-                registered_model_name="outerbounds-ridge",
+                X_train,
+                y_train,
+                cv=KFold(self.cv_folds, shuffle=True, random_state=42),
+                scoring="neg_mean_squared_error",
+                n_jobs=workers,
             )
+            fold_mse = -cv["test_score"]
+            self.cv_mse = float(fold_mse.mean())
+            params.update(degree=degree, cv_folds=self.cv_folds, cv_workers=workers)
+        else:
+            params.update(self.dataset_params)
+
+        # Train on the whole training split and evaluate
+        model.fit(X_train, y_train)
+        preds = model.predict(X_test)
+        self.mse = mean_squared_error(y_test, preds)
+        self.r2 = r2_score(y_test, preds)
+
+        if self.sweep:
+            run_name = f"ridge-alpha={alpha:g}-degree={degree}"
+        else:
+            run_name = "ridge-regression"
+        with mlflow.start_run(
+            run_name=run_name, parent_run_id=self.parent_run_id
+        ) as run:
+            logger = BatchLogger(run.info.run_id)
+
+            # Log params + metrics (batched, sent in the background)
+            logger.log_params(params)
+            for fold, mse in enumerate(fold_mse):
+                logger.log_metric("cv_fold_mse", mse, step=fold)
+            if self.cv_mse is not None:
+                logger.log_metric("cv_mse", self.cv_mse)
+            logger.log_metrics({"mse": self.mse, "r2": self.r2})
 
-            print(f"Logged run — MSE: {mse:.4f}, R2: {r2:.4f}")
-            print("Model registered as 'outerbounds-ridge'")
+            # Registered in the join step, if it is the best model
+            model_info = mlflow.sklearn.log_model(model, artifact_path="ridge-model")
 
-        self.mse = mse
-        self.r2 = r2
+            # Wait for the queued params + metrics before the run ends
+            logger.close()
+
+        self.run_id = run.info.run_id
+        self.model_uri = model_info.model_uri
+        cv_summary = (
+            f"CV MSE {self.cv_mse:.4f} ({workers} workers), " if self.sweep else ""
+        )
+        print(f"{run_name}: {cv_summary}test MSE {self.mse:.4f}, R2 {self.r2:.4f}")
+        self.next(self.join)
+
+    @step
+    def join(self, inputs):
+        """Register the model, in a sweep the one with the lowest CV error."""
+        import mlflow
+
+        self.merge_artifacts(inputs, include=["mlflow_uri", "parent_run_id"])
+        self.results = [
+            {
+                **branch.params,
+                "cv_mse": branch.cv_mse,
+                "mse": branch.mse,
+                "r2": branch.r2,
+            }
+            for branch in inputs
+        ]
+        if self.sweep:
+            self.results.sort(key=lambda result: result["cv_mse"])
+            # Selected on CV error, so the test split stays an unbiased estimate
+            best = min(inputs, key=lambda branch: branch.cv_mse)
+        else:
+            best = inputs[0]
+        self.best_params = best.params
+        self.best_run_id = best.run_id
+        self.mse = best.mse
+        self.r2 = best.r2
+
+        mlflow.set_tracking_uri(self.mlflow_uri)
+        version = mlflow.register_model(best.model_uri, REGISTERED_MODEL_NAME)
+        self.model_version = version.version
+
+        if self.sweep:
+            # Summarise the sweep on the parent run
+            with mlflow.start_run(run_id=self.parent_run_id):
+                mlflow.log_params({f"best_{k}": v for k, v in best.params.items()})
+                mlflow.log_metrics(
+                    {
+                        "best_cv_mse": best.cv_mse,
+                        "best_mse": best.mse,
+                        "best_r2": best.r2,
+                    }
+                )
+                mlflow.set_tag("best_run_id", best.run_id)
+
+            print(f"{'alpha':>8} {'degree':>6} {'CV MSE':>8} {'MSE':>8} {'R2':>8}")
+            for result in self.results:
+                print(
+                    f"{result['alpha']:>8g} {result['degree']:>6} "
+                    f"{result['cv_mse']:>8.4f} {result['mse']:>8.4f} {result['r2']:>8.4f}"
+                )
+        print(
+            f"Registered '{REGISTERED_MODEL_NAME}' version {self.model_version}: "
+            f"alpha={self.best_params['alpha']:g}, degree={self.best_params['degree']}"
+        )
         self.next(self.end)
 
     @step